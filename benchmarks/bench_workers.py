@@ -0,0 +1,113 @@
+"""
+Measure request throughput of `python -m src.server` for different worker counts.
+
+Usage:
+    python benchmarks/bench_workers.py --workers 1 2 4 --duration 10 --path /
+"""
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+async def _connection(host: str, port: int, request: bytes, deadline: float) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    done = 0
+    try:
+        while time.monotonic() < deadline:
+            writer.write(request)
+            await writer.drain()
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            done += 1
+    finally:
+        writer.close()
+    return done
+
+
+def _client(host: str, port: int, path: str, connections: int, duration: float, results) -> None:
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode()
+
+    async def run():
+        deadline = time.monotonic() + duration
+        counts = await asyncio.gather(
+            *(_connection(host, port, request, deadline) for _ in range(connections))
+        )
+        return sum(counts)
+
+    results.put(asyncio.run(run()))
+
+
+def _wait_for_port(host: str, port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not start on {host}:{port}")
+
+
+def bench(workers: int, args) -> float:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "src.server", "--host", args.host, "--port", str(args.port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    try:
+        _wait_for_port(args.host, args.port)
+        time.sleep(1.0)
+
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(
+                target=_client,
+                args=(args.host, args.port, args.path, args.connections, args.duration, results),
+            )
+            for _ in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        total = sum(results.get() for _ in clients)
+        for client in clients:
+            client.join()
+        return total / args.duration
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=multiprocessing.cpu_count(),
+                        help="load generator processes")
+    parser.add_argument("--connections", type=int, default=32,
+                        help="keep-alive connections per load generator process")
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>8} {'req/s':>12} {'speedup':>8}")
+    for workers in args.workers:
+        rate = bench(workers, args)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>12.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Any, Optional
+from datetime import datetime
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from src.app.database.database import get_db, get_session, get_existence
+from src.app.database.existence import INDEXED_COLLECTIONS
+from src.app.schemas.shema import (
+    BatchRequest, BatchResponse, BatchResult, BatchOperation,
+    FlightCreate, FlightUpdate, PassportCreate, PassportBase,
+    ClientCreate, ClientBase, ReservationCreate,
+)
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+MAX_OPERATIONS = 100
+
+CREATE_SCHEMAS = {
+    "flights": FlightCreate,
+    "passports": PassportCreate,
+    "clients": ClientCreate,
+    "reservations": ReservationCreate,
+}
+UPDATE_SCHEMAS = {
+    "flights": FlightUpdate,
+    "passports": PassportBase,
+    "clients": ClientBase,
+    "reservations": ReservationCreate,
+}
+# Foreign key fields of each resource and the collection they point to.
+REFERENCES = {
+    "clients": {"passport_id": "passports"},
+    "reservations": {"flight_id": "flights", "client_id": "clients", "passport_id": "passports"},
+}
+
+
+class _Step:
+    __slots__ = ("index", "op", "resource", "ref", "object_id", "data")
+
+    def __init__(self, index: int, op: str, resource: str, ref: Optional[str], object_id: ObjectId, data: Optional[dict]):
+        self.index = index
+        self.op = op
+        self.resource = resource
+        self.ref = ref
+        self.object_id = object_id
+        self.data = data
+
+
+class BatchAborted(Exception):
+    def __init__(self, index: int):
+        self.index = index
+
+
+def _resolve(value: Any, refs: dict[str, str], index: int) -> Any:
+    """
+    Replace {"$ref": "<name>"} placeholders with IDs produced by earlier operations.
+    """
+    if isinstance(value, dict):
+        if set(value) == {"$ref"}:
+            name = value["$ref"]
+            if name not in refs:
+                raise HTTPException(status_code=400, detail=f"Operation {index}: unknown reference '{name}'")
+            return refs[name]
+        return {k: _resolve(v, refs, index) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v, refs, index) for v in value]
+    return value
+
+
+def _validate(schema, body: dict, index: int) -> dict:
+    try:
+        return schema(**body).model_dump()
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Operation {index}: {e}")
+
+
+def _prepare(operations: list[BatchOperation]) -> list[_Step]:
+    refs: dict[str, str] = {}
+    steps = []
+    for index, operation in enumerate(operations):
+        data = None
+        if operation.op == "create":
+            object_id = ObjectId()
+            data = _validate(CREATE_SCHEMAS[operation.resource], _resolve(operation.body or {}, refs, index), index)
+        else:
+            target = _resolve(operation.id, refs, index)
+            if not isinstance(target, str) or not ObjectId.is_valid(target):
+                raise HTTPException(status_code=400, detail=f"Operation {index}: invalid or missing id")
+            object_id = ObjectId(target)
+            if operation.op == "update":
+                body = _resolve(operation.body or {}, refs, index)
+                data = {
+                    k: v for k, v in _validate(UPDATE_SCHEMAS[operation.resource], body, index).items()
+                    if v is not None
+                }
+
+        if operation.resource == "flights" and data:
+            try:
+                if "date_of_flight" in data:
+                    datetime.strptime(data["date_of_flight"], "%Y-%m-%d")
+                if "departure_time" in data:
+                    datetime.strptime(data["departure_time"], "%H:%M")
+            except ValueError:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Operation {index}: Invalid date or time format. "
+                           f"Use YYYY-MM-DD for date and HH:MM for time"
+                )
+
+        if operation.ref:
+            if operation.ref in refs:
+                raise HTTPException(status_code=400, detail=f"Operation {index}: duplicate ref '{operation.ref}'")
+            refs[operation.ref] = str(object_id)
+        steps.append(_Step(index, operation.op, operation.resource, operation.ref, object_id, data))
+    return steps
+
+
+def _external_references(steps: list[_Step]) -> dict[str, list[str]]:
+    """
+    Foreign keys that are not satisfied by documents created earlier in the batch.
+
+    A reference to a document created earlier must point at the collection the
+    field refers to; an ID created in any other collection is rejected.
+    """
+    # Collection each ID created so far was inserted into.
+    created_in: dict[str, str] = {}
+    external: dict[str, list[str]] = {}
+    for step in steps:
+        for field, collection in REFERENCES.get(step.resource, {}).items():
+            if step.data is None or field not in step.data:
+                continue
+            values = step.data[field] if isinstance(step.data[field], list) else [step.data[field]]
+            for value in values:
+                origin = created_in.get(value)
+                if origin == collection:
+                    continue
+                if origin is not None:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Operation {step.index}: {field} must reference {collection}, "
+                               f"not {origin}",
+                    )
+                external.setdefault(collection, []).append(value)
+        if step.op == "create":
+            created_in[str(step.object_id)] = step.resource
+    return external
+
+
+def _group(steps: list[_Step]) -> list[list[_Step]]:
+    """
+    Merge consecutive creates on the same resource so they become one insert_many.
+    """
+    groups: list[list[_Step]] = []
+    for step in steps:
+        previous = groups[-1][0] if groups else None
+        if step.op == "create" and previous is not None \
+                and previous.op == "create" and previous.resource == step.resource:
+            groups[-1].append(step)
+        else:
+            groups.append([step])
+    return groups
+
+
+def _document_body(document: dict) -> dict:
+    document["id"] = str(document.pop("_id"))
+    return document
+
+
+async def _run_group(db, session, group: list[_Step], results: list[Optional[BatchResult]]) -> None:
+    first = group[0]
+    collection = db[first.resource]
+
+    if first.op == "create":
+        documents = [{"_id": step.object_id, **step.data} for step in group]
+        try:
+            if len(documents) == 1:
+                await collection.insert_one(documents[0], session=session)
+            else:
+                await collection.insert_many(documents, ordered=True, session=session)
+            inserted = len(group)
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            error = e.details["writeErrors"][0]["errmsg"] if e.details.get("writeErrors") else str(e)
+        except PyMongoError as e:
+            inserted = 0
+            error = str(e)
+        for step, document in zip(group[:inserted], documents):
+            results[step.index] = BatchResult(
+                status=201, ref=step.ref, id=str(step.object_id), body=_document_body(dict(document))
+            )
+        if inserted < len(group):
+            failed = group[inserted]
+            results[failed.index] = BatchResult(status=400, ref=failed.ref, id=str(failed.object_id), detail=error)
+            raise BatchAborted(failed.index)
+        return
+
+    step = first
+    result = BatchResult(status=200, ref=step.ref, id=str(step.object_id))
+    try:
+        if step.op == "get" or (step.op == "update" and not step.data):
+            document = await collection.find_one({"_id": step.object_id}, session=session)
+            if document is not None:
+                result.body = _document_body(document)
+        elif step.op == "update":
+            document = await collection.find_one_and_update(
+                {"_id": step.object_id},
+                {"$set": step.data},
+                return_document=ReturnDocument.AFTER,
+                session=session,
+            )
+            if document is not None:
+                result.body = _document_body(document)
+        else:
+            deleted = await collection.delete_one({"_id": step.object_id}, session=session)
+            document = {} if deleted.deleted_count else None
+            result.status = 204
+    except PyMongoError as e:
+        results[step.index] = BatchResult(status=400, ref=step.ref, id=str(step.object_id), detail=str(e))
+        raise BatchAborted(step.index)
+
+    if document is None:
+        result.status = 404
+        result.detail = f"{step.resource[:-1].capitalize()} not found"
+        results[step.index] = result
+        raise BatchAborted(step.index)
+    results[step.index] = result
+
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(
+        batch: BatchRequest,
+        db=Depends(get_db),
+        session=Depends(get_session),
+        existence=Depends(get_existence)
+):
+    """
+    Execute an ordered list of operations in one request.
+
+    Later operations can use {"$ref": "<ref>"} wherever an ID produced by an
+    earlier operation is expected. Execution stops at the first failure; with
+    "transaction": true everything before it is rolled back as well.
+    """
+    if not batch.operations:
+        raise HTTPException(status_code=400, detail="No operations given")
+    if len(batch.operations) > MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_OPERATIONS} operations per batch")
+
+    steps = _prepare(batch.operations)
+    await existence.require(db, _external_references(steps))
+
+    results: list[Optional[BatchResult]] = [None] * len(steps)
+    failed_index = None
+    try:
+        if batch.transaction:
+            async with session.start_transaction():
+                for group in _group(steps):
+                    await _run_group(db, session, group, results)
+        else:
+            for group in _group(steps):
+                await _run_group(db, session, group, results)
+    except BatchAborted as e:
+        failed_index = e.index
+    except PyMongoError as e:
+        raise HTTPException(status_code=409, detail=f"Transaction failed: {e}")
+
+    for step in steps:
+        result = results[step.index]
+        if result is None:
+            results[step.index] = BatchResult(
+                status=424, ref=step.ref, id=str(step.object_id),
+                detail=f"Not executed: operation {failed_index} failed",
+            )
+        elif batch.transaction and failed_index is not None and step.index != failed_index:
+            results[step.index] = BatchResult(
+                status=424, ref=step.ref, id=str(step.object_id),
+                detail=f"Rolled back: operation {failed_index} failed",
+            )
+        elif step.resource in INDEXED_COLLECTIONS:
+            if result.status == 201:
+                existence.add(step.resource, step.object_id)
+            elif result.status == 204:
+                existence.discard(step.resource, step.object_id)
+
+    return BatchResponse(results=results)
@@ -2,27 +2,30 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List
 from bson import ObjectId
 from fastapi.encoders import jsonable_encoder
-from src.app.database.database import get_db
+from src.app.database.database import get_db, read_db, get_session, get_existence
 from src.app.schemas.shema import ClientCreate, ClientResponse, ClientBase
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
 
 @router.post("/", response_model=ClientResponse, status_code=201)
-async def create_client(client: ClientCreate, db=Depends(get_db)):
+async def create_client(
+        client: ClientCreate,
+        db=Depends(get_db),
+        session=Depends(get_session),
+        existence=Depends(get_existence)
+):
     """
     Create a new client.
     """
+    await existence.require(db, {"passports": [client.passport_id]})
     try:
-        passport = await db.passports.find_one({"_id": ObjectId(client.passport_id)})
-        if not passport:
-            raise HTTPException(status_code=404, detail="Passport not found")
-
         client_data = client.model_dump()
         client_data["passport_id"] = client.passport_id
 
-        new_client = await db.clients.insert_one(client_data)
-        created_client = await db.clients.find_one({"_id": new_client.inserted_id})
+        new_client = await db.clients.insert_one(client_data, session=session)
+        existence.add("clients", new_client.inserted_id)
+        created_client = await db.clients.find_one({"_id": new_client.inserted_id}, session=session)
 
         if created_client:
             created_client["id"] = str(created_client.pop("_id"))
@@ -34,7 +37,7 @@ async def create_client(client: ClientCreate, db=Depends(get_db)):
 
 
 @router.get("/{client_id}", response_model=ClientResponse)
-async def get_client(client_id: str, db=Depends(get_db)):
+async def get_client(client_id: str, db=Depends(read_db("get_client")), session=Depends(get_session)):
     """
     Retrieve a client by ID.
     """
@@ -43,7 +46,7 @@ async def get_client(client_id: str, db=Depends(get_db)):
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid client ID format")
 
-    client = await db.clients.find_one({"_id": object_id})
+    client = await db.clients.find_one({"_id": object_id}, session=session)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
@@ -55,12 +58,13 @@ async def get_client(client_id: str, db=Depends(get_db)):
 async def list_clients(
         skip: int = Query(default=0, ge=0),
         limit: int = Query(default=10, ge=1, le=100),
-        db=Depends(get_db)
+        db=Depends(read_db("list_clients")),
+        session=Depends(get_session)
 ):
     """
     Retrieve a list of clients with pagination.
     """
-    clients = await db.clients.find().skip(skip).limit(limit).to_list(limit)
+    clients = await db.clients.find(session=session).skip(skip).limit(limit).to_list(limit)
 
     for client in clients:
         client["id"] = str(client.pop("_id"))
@@ -71,7 +75,8 @@ async def list_clients(
 async def update_client(
         client_id: str,
         client_update: ClientBase,
-        db=Depends(get_db)
+        db=Depends(get_db),
+        session=Depends(get_session)
 ):
     """
     Update client details by ID.
@@ -88,20 +93,26 @@ async def update_client(
     if update_data:
         result = await db.clients.update_one(
             {"_id": object_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            session=session
         )
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        updated_client = await db.clients.find_one({"_id": object_id})
+        updated_client = await db.clients.find_one({"_id": object_id}, session=session)
         updated_client["id"] = str(updated_client.pop("_id"))
         return updated_client
-    return await get_client(client_id, db)
+    return await get_client(client_id, db, session)
 
 
 @router.delete("/{client_id}", status_code=204)
-async def delete_client(client_id: str, db=Depends(get_db)):
+async def delete_client(
+        client_id: str,
+        db=Depends(get_db),
+        session=Depends(get_session),
+        existence=Depends(get_existence)
+):
     """
     Delete a client by ID.
     """
@@ -110,9 +121,10 @@ async def delete_client(client_id: str, db=Depends(get_db)):
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid client ID format")
 
-    result = await db.clients.delete_one({"_id": object_id})
+    result = await db.clients.delete_one({"_id": object_id}, session=session)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Client not found")
+    existence.discard("clients", object_id)
 
 
 @router.get("/search", response_model=List[ClientResponse])
@@ -120,7 +132,8 @@ async def search_clients(
         mail: str = Query(default=None),
         phone_number: str = Query(default=None),
         nick_name: str = Query(default=None),
-        db=Depends(get_db)
+        db=Depends(read_db("search_clients")),
+        session=Depends(get_session)
 ):
     """
     Search clients by email, phone number, or nickname.
@@ -133,7 +146,7 @@ async def search_clients(
     if nick_name:
         query["nick_name"] = nick_name
 
-    clients = await db.clients.find(query).to_list(None)
+    clients = await db.clients.find(query, session=session).to_list(None)
 
     for client in clients:
         client["id"] = str(client.pop("_id"))
@@ -5,21 +5,28 @@ from bson import ObjectId
 
 from fastapi.encoders import jsonable_encoder
 
-from src.app.database.database import get_db
+from src.app.database.database import get_db, read_db, get_session, get_existence
+from src.app.database.archive import find_one_with_archive, find_with_archive
 from src.app.schemas.shema import FlightCreate, FlightResponse, FlightUpdate
 
 router = APIRouter(prefix="/flights", tags=["flights"])
 
 
 @router.post("/", response_model=FlightResponse, status_code=201)
-async def create_flight(flight: FlightCreate, db=Depends(get_db)):
+async def create_flight(
+        flight: FlightCreate,
+        db=Depends(get_db),
+        session=Depends(get_session),
+        existence=Depends(get_existence)
+):
     try:
         datetime.strptime(flight.date_of_flight, "%Y-%m-%d")
         datetime.strptime(flight.departure_time, "%H:%M")
 
-        new_flight = await db.flights.insert_one(flight.model_dump())
+        new_flight = await db.flights.insert_one(flight.model_dump(), session=session)
+        existence.add("flights", new_flight.inserted_id)
 
-        created_flight = await db.flights.find_one({"_id": new_flight.inserted_id})
+        created_flight = await db.flights.find_one({"_id": new_flight.inserted_id}, session=session)
 
         if created_flight:
             created_flight["id"] = str(created_flight.pop("_id"))
@@ -35,13 +42,13 @@ async def create_flight(flight: FlightCreate, db=Depends(get_db)):
 
 
 @router.get("/{flight_id}", response_model=FlightResponse)
-async def get_flight(flight_id: str, db=Depends(get_db)):
+async def get_flight(flight_id: str, db=Depends(read_db("get_flight")), session=Depends(get_session)):
     try:
         object_id = ObjectId(flight_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid flight ID format")
 
-    flight = await db.flights.find_one({"_id": object_id})
+    flight = await find_one_with_archive(db, "flights", {"_id": object_id}, session)
     if not flight:
         raise HTTPException(status_code=404, detail="Flight not found")
 
@@ -53,9 +60,14 @@ async def get_flight(flight_id: str, db=Depends(get_db)):
 async def list_flights(
         skip: int = Query(default=0, ge=0),
         limit: int = Query(default=10, ge=1, le=100),
-        db=Depends(get_db)
+        include_archived: bool = Query(default=False),
+        db=Depends(read_db("list_flights")),
+        session=Depends(get_session)
 ):
-    flights = await db.flights.find().skip(skip).limit(limit).to_list(limit)
+    if include_archived:
+        flights = await find_with_archive(db, "flights", {}, skip, limit, session)
+    else:
+        flights = await db.flights.find(session=session).skip(skip).limit(limit).to_list(limit)
 
     for flight in flights:
         flight["id"] = str(flight.pop("_id"))
@@ -66,7 +78,8 @@ async def list_flights(
 async def update_flight(
         flight_id: str,
         flight_update: FlightUpdate,
-        db=Depends(get_db)
+        db=Depends(get_db),
+        session=Depends(get_session)
 ):
     try:
         object_id = ObjectId(flight_id)
@@ -86,13 +99,14 @@ async def update_flight(
 
             result = await db.flights.update_one(
                 {"_id": object_id},
-                {"$set": update_data}
+                {"$set": update_data},
+                session=session
             )
 
             if result.modified_count == 0:
                 raise HTTPException(status_code=404, detail="Flight not found")
 
-            updated_flight = await db.flights.find_one({"_id": object_id})
+            updated_flight = await db.flights.find_one({"_id": object_id}, session=session)
             updated_flight["id"] = str(updated_flight.pop("_id"))
             return updated_flight
         except ValueError:
@@ -100,29 +114,42 @@ async def update_flight(
                 status_code=400,
                 detail="Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time"
             )
-    return await get_flight(flight_id, db)
+    return await get_flight(flight_id, db, session)
 
 
 @router.delete("/{flight_id}", status_code=204)
-async def delete_flight(flight_id: str, db=Depends(get_db)):
+async def delete_flight(
+        flight_id: str,
+        db=Depends(get_db),
+        session=Depends(get_session),
+        existence=Depends(get_existence)
+):
     try:
         object_id = ObjectId(flight_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid flight ID format")
 
-    result = await db.flights.delete_one({"_id": object_id})
+    result = await db.flights.delete_one({"_id": object_id}, session=session)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Flight not found")
+    existence.discard("flights", object_id)
 
 
 @router.get("/date/{date}", response_model=List[FlightResponse])
 async def get_flights_by_date(
         date: str,
-        db=Depends(get_db)
+        include_archived: bool = Query(default=False),
+        db=Depends(read_db("get_flights_by_date")),
+        session=Depends(get_session)
 ):
     try:
         datetime.strptime(date, "%Y-%m-%d")
-        flights = await db.flights.find({"date_of_flight": date}).to_list(None)
+        if include_archived:
+            flights = await find_with_archive(db, "flights", {"date_of_flight": date}, session=session)
+        else:
+            flights = await db.flights.find({"date_of_flight": date}, session=session).to_list(None)
+            if not flights:
+                flights = await db.flights_archive.find({"date_of_flight": date}, session=session).to_list(None)
 
         for flight in flights:
             flight["id"] = str(flight.pop("_id"))
@@ -0,0 +1,104 @@
+from fastapi import APIRouter, HTTPException, Query, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
+from bson import ObjectId
+
+from src.app.database.change_stream import Subscriber
+
+router = APIRouter(prefix="/flights", tags=["flights"])
+
+HEARTBEAT_SECONDS = 15.0
+
+
+def _make_subscriber(date: Optional[str], flight_id: Optional[str], include_reservations: bool) -> Subscriber:
+    if date is not None:
+        datetime.strptime(date, "%Y-%m-%d")
+    if flight_id is not None and not ObjectId.is_valid(flight_id):
+        raise ValueError("Invalid flight ID format")
+
+    collections = ("flights", "reservations") if include_reservations else ("flights",)
+    return Subscriber(collections=collections, date=date, flight_id=flight_id)
+
+
+@router.get("/stream")
+async def stream_flights(
+        request: Request,
+        date: Optional[str] = Query(default=None),
+        flight_id: Optional[str] = Query(default=None),
+        include_reservations: bool = Query(default=False),
+        last_event_id: Optional[str] = Header(default=None),
+):
+    """
+    Stream flight (and optionally reservation) changes as Server-Sent Events.
+
+    Reconnecting clients send the standard Last-Event-ID header to resume.
+    """
+    try:
+        subscriber = _make_subscriber(date, flight_id, include_reservations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    hub = request.app.state.change_hub
+    hub.subscribe(subscriber, last_event_id)
+
+    async def event_source():
+        try:
+            while True:
+                event = await subscriber.get(HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event.ends_stream:
+                    yield f"event: {event.operation}\ndata: {event.payload}\n\n"
+                    break
+                if event.is_control:
+                    # A reset keeps the stream open. The empty id clears the client's
+                    # Last-Event-ID so a later reconnect does not ask for the lost event again.
+                    yield f"id:\nevent: {event.operation}\ndata: {event.payload}\n\n"
+                    continue
+                yield f"id: {event.id}\nevent: {event.collection}\ndata: {event.payload}\n\n"
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/stream/ws")
+async def stream_flights_ws(
+        websocket: WebSocket,
+        date: Optional[str] = Query(default=None),
+        flight_id: Optional[str] = Query(default=None),
+        include_reservations: bool = Query(default=False),
+        last_event_id: Optional[str] = Query(default=None),
+):
+    """
+    Stream flight (and optionally reservation) changes over a WebSocket.
+    """
+    try:
+        subscriber = _make_subscriber(date, flight_id, include_reservations)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+    hub = websocket.app.state.change_hub
+    hub.subscribe(subscriber, last_event_id)
+    try:
+        while True:
+            event = await subscriber.get(HEARTBEAT_SECONDS)
+            if event is None:
+                await websocket.send_text('{"operation": "heartbeat"}')
+                continue
+            await websocket.send_text(event.payload)
+            if event.ends_stream:
+                await websocket.close(code=1013 if event.operation == "overflow" else 1000)
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(subscriber)
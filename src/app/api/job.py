@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from src.app.database.database import get_db
+from src.app.jobs.runner import COLLECTION, RESULTS_BUCKET
+from src.app.schemas.shema import JobCreate, JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _job_response(job: dict) -> dict:
+    job["id"] = str(job.pop("_id"))
+    for field in ("created_at", "started_at", "finished_at"):
+        if job.get(field) is not None:
+            job[field] = job[field].isoformat()
+    return job
+
+
+async def _find_job(db, job_id: str) -> dict:
+    try:
+        object_id = ObjectId(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid job ID format")
+
+    job = await db[COLLECTION].find_one({"_id": object_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/", response_model=JobResponse, status_code=202)
+async def submit_job(job: JobCreate, request: Request):
+    """
+    Queue a background job and return immediately.
+    """
+    try:
+        created = await request.app.state.jobs.submit(job.type, job.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _job_response(created)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, db=Depends(get_db)):
+    """
+    Retrieve a job's status and progress.
+    """
+    return _job_response(await _find_job(db, job_id))
+
+
+@router.get("/{job_id}/result")
+async def download_job_result(job_id: str, db=Depends(get_db)):
+    """
+    Download the file produced by a completed job.
+    """
+    job = await _find_job(db, job_id)
+    result = job.get("result") or {}
+    if job["status"] != "completed" or "file_id" not in result:
+        raise HTTPException(status_code=404, detail="Job has no downloadable result")
+
+    fs = AsyncIOMotorGridFSBucket(db, bucket_name=RESULTS_BUCKET)
+    try:
+        download = await fs.open_download_stream(ObjectId(result["file_id"]))
+    except NoFile:
+        raise HTTPException(status_code=404, detail="Job result has expired")
+
+    async def chunks():
+        while True:
+            chunk = await download.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+    return StreamingResponse(
+        chunks(),
+        media_type=result.get("content_type", "application/octet-stream"),
+        headers={"Content-Disposition": f'attachment; filename="{result["filename"]}"'},
+    )
@@ -2,20 +2,26 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List
 from bson import ObjectId
 from fastapi.encoders import jsonable_encoder
-from src.app.database.database import get_db
+from src.app.database.database import get_db, read_db, get_session, get_existence
 from src.app.schemas.shema import PassportCreate, PassportResponse, PassportBase
 
 router = APIRouter(prefix="/passports", tags=["passports"])
 
 
 @router.post("/", response_model=PassportResponse, status_code=201)
-async def create_passport(passport: PassportCreate, db=Depends(get_db)):
+async def create_passport(
+        passport: PassportCreate,
+        db=Depends(get_db),
+        session=Depends(get_session),
+        existence=Depends(get_existence)
+):
     """
     Create a new passport.
     """
     try:
-        new_passport = await db.passports.insert_one(passport.model_dump())
-        created_passport = await db.passports.find_one({"_id": new_passport.inserted_id})
+        new_passport = await db.passports.insert_one(passport.model_dump(), session=session)
+        existence.add("passports", new_passport.inserted_id)
+        created_passport = await db.passports.find_one({"_id": new_passport.inserted_id}, session=session)
 
         if created_passport:
             created_passport["id"] = str(created_passport.pop("_id"))
@@ -25,7 +31,7 @@ async def create_passport(passport: PassportCreate, db=Depends(get_db)):
 
 
 @router.get("/{passport_id}", response_model=PassportResponse)
-async def get_passport(passport_id: str, db=Depends(get_db)):
+async def get_passport(passport_id: str, db=Depends(read_db("get_passport")), session=Depends(get_session)):
     """
     Retrieve a passport by ID.
     """
@@ -34,7 +40,7 @@ async def get_passport(passport_id: str, db=Depends(get_db)):
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid passport ID format")
 
-    passport = await db.passports.find_one({"_id": object_id})
+    passport = await db.passports.find_one({"_id": object_id}, session=session)
     if not passport:
         raise HTTPException(status_code=404, detail="Passport not found")
 
@@ -46,12 +52,13 @@ async def get_passport(passport_id: str, db=Depends(get_db)):
 async def list_passports(
         skip: int = Query(default=0, ge=0),
         limit: int = Query(default=10, ge=1, le=100),
-        db=Depends(get_db)
+        db=Depends(read_db("list_passports")),
+        session=Depends(get_session)
 ):
     """
     Retrieve a list of passports with pagination.
     """
-    passports = await db.passports.find().skip(skip).limit(limit).to_list(limit)
+    passports = await db.passports.find(session=session).skip(skip).limit(limit).to_list(limit)
 
     for passport in passports:
         passport["id"] = str(passport.pop("_id"))
@@ -62,7 +69,8 @@ async def list_passports(
 async def update_passport(
         passport_id: str,
         passport_update: PassportBase,
-        db=Depends(get_db)
+        db=Depends(get_db),
+        session=Depends(get_session)
 ):
     """
     Update passport details by ID.
@@ -79,20 +87,26 @@ async def update_passport(
     if update_data:
         result = await db.passports.update_one(
             {"_id": object_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            session=session
         )
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Passport not found")
 
-        updated_passport = await db.passports.find_one({"_id": object_id})
+        updated_passport = await db.passports.find_one({"_id": object_id}, session=session)
         updated_passport["id"] = str(updated_passport.pop("_id"))
         return updated_passport
-    return await get_passport(passport_id, db)
+    return await get_passport(passport_id, db, session)
 
 
 @router.delete("/{passport_id}", status_code=204)
-async def delete_passport(passport_id: str, db=Depends(get_db)):
+async def delete_passport(
+        passport_id: str,
+        db=Depends(get_db),
+        session=Depends(get_session),
+        existence=Depends(get_existence)
+):
     """
     Delete a passport by ID.
     """
@@ -101,9 +115,10 @@ async def delete_passport(passport_id: str, db=Depends(get_db)):
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid passport ID format")
 
-    result = await db.passports.delete_one({"_id": object_id})
+    result = await db.passports.delete_one({"_id": object_id}, session=session)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Passport not found")
+    existence.discard("passports", object_id)
 
 
 @router.get("/search", response_model=List[PassportResponse])
@@ -111,7 +126,8 @@ async def search_passports(
         passport_number: str = Query(default=None),
         firstname: str = Query(default=None),
         lastname: str = Query(default=None),
-        db=Depends(get_db)
+        db=Depends(read_db("search_passports")),
+        session=Depends(get_session)
 ):
     """
     Search passports by passport number, firstname, or lastname.
@@ -124,7 +140,7 @@ async def search_passports(
     if lastname:
         query["lastname"] = lastname
 
-    passports = await db.passports.find(query).to_list(None)
+    passports = await db.passports.find(query, session=session).to_list(None)
 
     for passport in passports:
         passport["id"] = str(passport.pop("_id"))
@@ -1,47 +1,74 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List
 from src.app.schemas.shema import ReservationCreate, ReservationResponse, ReservationFull
-from src.app.database.database import get_db
+from src.app.database.database import get_db, read_db, get_session, get_existence
 from src.app.database.reservation_crud import create_reservation, get_reservation_by_id, get_all_reservations, update_reservation, delete_reservation
 
 router = APIRouter()
 
 
+def _references(reservation: ReservationCreate) -> dict[str, list[str]]:
+    return {
+        "flights": [reservation.flight_id],
+        "clients": [reservation.client_id],
+        "passports": reservation.passport_id,
+    }
+
+
 @router.post("/", response_model=ReservationResponse, status_code=201)
-async def create_new_reservation(reservation: ReservationCreate, db=Depends(get_db)):
+async def create_new_reservation(
+        reservation: ReservationCreate,
+        db=Depends(get_db),
+        session=Depends(get_session),
+        existence=Depends(get_existence)
+):
     """
     Create a new reservation.
     """
-    return await create_reservation(db, reservation.dict())
+    await existence.require(db, _references(reservation))
+    return await create_reservation(db, reservation.dict(), session)
 
 
 @router.get("/{reservation_id}", response_model=ReservationFull)
-async def get_reservation(reservation_id: str, db=Depends(get_db)):
+async def get_reservation(reservation_id: str, db=Depends(read_db("get_reservation")), session=Depends(get_session)):
     """
     Retrieve a reservation by ID.
     """
-    return await get_reservation_by_id(db, reservation_id)
+    return await get_reservation_by_id(db, reservation_id, session)
 
 
 @router.get("/", response_model=List[ReservationResponse])
-async def list_reservations(skip: int = 0, limit: int = 10, db=Depends(get_db)):
+async def list_reservations(
+        skip: int = 0,
+        limit: int = 10,
+        include_archived: bool = False,
+        db=Depends(read_db("list_reservations")),
+        session=Depends(get_session)
+):
     """
     List all reservations with pagination.
     """
-    return await get_all_reservations(db, limit, skip)
+    return await get_all_reservations(db, limit, skip, session, include_archived)
 
 
 @router.put("/{reservation_id}", response_model=ReservationResponse)
-async def update_reservation_data(reservation_id: str, reservation: ReservationCreate, db=Depends(get_db)):
+async def update_reservation_data(
+        reservation_id: str,
+        reservation: ReservationCreate,
+        db=Depends(get_db),
+        session=Depends(get_session),
+        existence=Depends(get_existence)
+):
     """
     Update an existing reservation by ID.
     """
-    return await update_reservation(db, reservation_id, reservation.dict())
+    await existence.require(db, _references(reservation))
+    return await update_reservation(db, reservation_id, reservation.dict(), session)
 
 
 @router.delete("/{reservation_id}", response_model=ReservationResponse)
-async def delete_existing_reservation(reservation_id: str, db=Depends(get_db)):
+async def delete_existing_reservation(reservation_id: str, db=Depends(get_db), session=Depends(get_session)):
     """
     Delete a reservation by ID.
     """
-    return await delete_reservation(db, reservation_id)
+    return await delete_reservation(db, reservation_id, session)
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_HORIZON_DAYS = 30
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_INTERVAL_SECONDS = 3600
+
+
+def archive_name(collection: str) -> str:
+    return f"{collection}_archive"
+
+
+async def find_one_with_archive(db: AsyncIOMotorDatabase, collection: str, query: dict, session=None) -> dict | None:
+    """
+    Look a document up in the hot collection, falling back to its archive on a miss.
+    """
+    document = await db[collection].find_one(query, session=session)
+    if document is None:
+        document = await db[archive_name(collection)].find_one(query, session=session)
+    return document
+
+
+async def find_with_archive(
+        db: AsyncIOMotorDatabase,
+        collection: str,
+        query: dict,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        session=None,
+) -> list[dict]:
+    """
+    Query the hot collection and its archive as one result set, hot documents first.
+    """
+    pipeline = [
+        {"$match": query},
+        {"$unionWith": {"coll": archive_name(collection), "pipeline": [{"$match": query}]}},
+    ]
+    if skip:
+        pipeline.append({"$skip": skip})
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+    return await db[collection].aggregate(pipeline, session=session).to_list(limit)
+
+
+def archive_cutoff(horizon_days: int = ARCHIVE_HORIZON_DAYS) -> str:
+    """
+    Flights dated strictly before the returned YYYY-MM-DD string are archived.
+    """
+    return (datetime.now(timezone.utc).date() - timedelta(days=horizon_days)).strftime("%Y-%m-%d")
+
+
+async def archive_batch(
+        db: AsyncIOMotorDatabase, cutoff: str, batch_size: int = ARCHIVE_BATCH_SIZE, existence=None
+) -> int:
+    """
+    Move one batch of departed flights and their reservations to the archive.
+
+    Documents are copied with upserts before they are deleted, so a batch that
+    is interrupted part way is simply repeated by the next run. Reservations
+    are swept once more after the flights are gone, so one booked while the
+    batch was running does not stay behind in the hot tier.
+    """
+    flights = await db.flights.find(
+        {"date_of_flight": {"$lt": cutoff}}
+    ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+    if not flights:
+        return 0
+
+    flight_ids = [flight["_id"] for flight in flights]
+    reservations_query = {"flight_id": {"$in": [str(flight_id) for flight_id in flight_ids]}}
+
+    await _move_reservations(db, reservations_query)
+    await db[archive_name("flights")].bulk_write(
+        [ReplaceOne({"_id": f["_id"]}, f, upsert=True) for f in flights], ordered=False
+    )
+    await db.flights.delete_many({"_id": {"$in": flight_ids}})
+    await _move_reservations(db, reservations_query)
+    if existence is not None:
+        for flight_id in flight_ids:
+            existence.discard("flights", flight_id)
+    return len(flights)
+
+
+async def _move_reservations(db: AsyncIOMotorDatabase, query: dict) -> None:
+    while True:
+        reservations = await db.reservations.find(query).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+        if not reservations:
+            return
+        await db[archive_name("reservations")].bulk_write(
+            [ReplaceOne({"_id": r["_id"]}, r, upsert=True) for r in reservations], ordered=False
+        )
+        await db.reservations.delete_many({"_id": {"$in": [r["_id"] for r in reservations]}})
+
+
+async def archive_departed_flights(
+        db: AsyncIOMotorDatabase,
+        horizon_days: int = ARCHIVE_HORIZON_DAYS,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        existence=None,
+) -> int:
+    """
+    Archive every flight older than the horizon, batch by batch.
+    """
+    cutoff = archive_cutoff(horizon_days)
+    total = 0
+    while True:
+        moved = await archive_batch(db, cutoff, batch_size, existence)
+        if moved == 0:
+            return total
+        total += moved
+
+
+async def ensure_archive_indexes(db: AsyncIOMotorDatabase) -> None:
+    await db.flights.create_index("date_of_flight")
+    await db.reservations.create_index("flight_id")
+    await db[archive_name("flights")].create_index("date_of_flight")
+    await db[archive_name("reservations")].create_index("flight_id")
+
+
+class Archiver:
+    """
+    Periodically archives departed flights.
+
+    Every worker process runs one, but a lease in the archive_state collection
+    lets only one of them do the work at a time.
+    """
+
+    def __init__(
+            self,
+            db: AsyncIOMotorDatabase,
+            horizon_days: int = ARCHIVE_HORIZON_DAYS,
+            batch_size: int = ARCHIVE_BATCH_SIZE,
+            interval_seconds: float = ARCHIVE_INTERVAL_SECONDS,
+            existence=None,
+    ):
+        self._db = db
+        self._existence = existence
+        self._horizon_days = horizon_days
+        self._batch_size = batch_size
+        self._interval = interval_seconds
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _acquire_lease(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self._db.archive_state.find_one_and_update(
+                {"_id": "archiver", "$or": [{"lease_expires": {"$lt": now}}, {"owner": self._owner}]},
+                {"$set": {"owner": self._owner, "lease_expires": now + timedelta(seconds=self._interval)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _run(self) -> None:
+        try:
+            await ensure_archive_indexes(self._db)
+        except PyMongoError as e:
+            logger.warning("Could not create archive indexes: %s", e)
+        while True:
+            try:
+                if await self._acquire_lease():
+                    moved = await archive_departed_flights(
+                        self._db, self._horizon_days, self._batch_size, self._existence
+                    )
+                    if moved:
+                        logger.info("Archived %d departed flights", moved)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning("Archiving failed: %s", e)
+            await asyncio.sleep(self._interval)
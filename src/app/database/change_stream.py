@@ -0,0 +1,363 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict, deque
+from typing import Callable, Iterable, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import CollectionInvalid, OperationFailure, PyMongoError
+
+from src.app.database.archive import ARCHIVE_HORIZON_DAYS, archive_cutoff
+
+logger = logging.getLogger(__name__)
+
+# Clients and passports are watched only for listeners such as the existence indexes.
+WATCHED_COLLECTIONS = ("flights", "reservations", "clients", "passports")
+PRE_IMAGE_COLLECTIONS = ("flights", "reservations")
+SUBSCRIBER_QUEUE_SIZE = 256
+REPLAY_BUFFER_SIZE = 2048
+RETRY_DELAY_SECONDS = 2.0
+FLIGHT_DATE_CACHE_SIZE = 10_000
+# Control events after which the subscriber is no longer registered.
+ENDING_EVENTS = ("overflow", "shutdown")
+
+# Server error codes that mean the stream cannot be (re)opened as requested.
+CHANGE_STREAM_HISTORY_LOST = 286
+CHANGE_STREAM_NOT_SUPPORTED = 40573
+NAMESPACE_NOT_FOUND = 26
+
+
+class ChangeEvent:
+    """
+    A single change, serialized once and shared by every subscriber.
+    """
+    __slots__ = ("id", "collection", "operation", "flight_id", "date_of_flight", "payload", "document_id")
+
+    def __init__(
+            self,
+            id: Optional[str],
+            collection: Optional[str],
+            operation: str,
+            flight_id: Optional[str] = None,
+            date_of_flight: Optional[str] = None,
+            payload: str = "{}",
+            document_id: Optional[str] = None,
+    ):
+        self.id = id
+        self.collection = collection
+        self.operation = operation
+        self.flight_id = flight_id
+        self.date_of_flight = date_of_flight
+        self.payload = payload
+        self.document_id = document_id
+
+    @property
+    def is_control(self) -> bool:
+        return self.collection is None
+
+    @property
+    def ends_stream(self) -> bool:
+        """
+        Overflow and shutdown end a stream; after a reset the subscriber keeps receiving events.
+        """
+        return self.is_control and self.operation in ENDING_EVENTS
+
+
+def _control_event(operation: str) -> ChangeEvent:
+    return ChangeEvent(None, None, operation, payload=json.dumps({"operation": operation}))
+
+
+class Subscriber:
+    """
+    One connected SSE/WebSocket consumer with its filters and bounded queue.
+    """
+
+    def __init__(
+            self,
+            collections: Iterable[str] = ("flights",),
+            date: Optional[str] = None,
+            flight_id: Optional[str] = None,
+            queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+    ):
+        self.collections = frozenset(collections)
+        self.date = date
+        self.flight_id = flight_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def matches(self, event: ChangeEvent) -> bool:
+        """
+        Events whose flight or date could not be resolved never pass a filter on it.
+        """
+        if event.collection not in self.collections:
+            return False
+        if self.flight_id and event.flight_id != self.flight_id:
+            return False
+        if self.date and event.date_of_flight != self.date:
+            return False
+        return True
+
+    async def get(self, timeout: float) -> Optional[ChangeEvent]:
+        """
+        Wait for the next event, returning None if nothing arrived within timeout.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ChangeStreamHub:
+    """
+    Tails one database-level change stream per process and fans events out to subscribers.
+
+    Slow consumers never block the stream: when a subscriber's queue fills up it is
+    dropped and sent an "overflow" event, after which it is expected to reconnect
+    with the last event id it processed and replay from the in-memory buffer.
+    """
+
+    def __init__(
+            self,
+            db: AsyncIOMotorDatabase,
+            collections: Iterable[str] = WATCHED_COLLECTIONS,
+            archive_horizon_days: int = ARCHIVE_HORIZON_DAYS,
+    ):
+        self._db = db
+        self._collections = list(collections)
+        # Must match the Archiver's horizon, or its deletes reach subscribers.
+        self._archive_horizon_days = archive_horizon_days
+        self._subscribers: set[Subscriber] = set()
+        self._listeners: list[Callable[[ChangeEvent], None]] = []
+        self._buffer: deque[ChangeEvent] = deque(maxlen=REPLAY_BUFFER_SIZE)
+        self._resume_token: Optional[dict] = None
+        self._flight_dates: OrderedDict[str, str] = OrderedDict()
+        self._pre_images = False
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.close_subscribers()
+
+    def close_subscribers(self, reason: str = "shutdown") -> None:
+        """
+        End every open stream and refuse new ones, so a server drain is not held up by them.
+        """
+        self._closing = True
+        for subscriber in list(self._subscribers):
+            self._close(subscriber, reason)
+
+    def subscribe(self, subscriber: Subscriber, last_event_id: Optional[str] = None) -> Subscriber:
+        """
+        Register a subscriber, replaying buffered events newer than last_event_id.
+
+        If last_event_id is no longer buffered the subscriber receives a "reset"
+        event and should reload its state through the regular read endpoints.
+        """
+        if self._closing:
+            subscriber.queue.put_nowait(_control_event("shutdown"))
+            return subscriber
+        if last_event_id:
+            replay = self._events_after(last_event_id)
+            if replay is None:
+                subscriber.queue.put_nowait(_control_event("reset"))
+            else:
+                for event in replay:
+                    if subscriber.matches(event) and not self._offer(subscriber, event):
+                        return subscriber
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def add_listener(self, listener: Callable[[ChangeEvent], None]) -> None:
+        """
+        Call listener with every change, including ones no subscriber would see.
+        """
+        self._listeners.append(listener)
+
+    def _events_after(self, event_id: str) -> Optional[list[ChangeEvent]]:
+        events = list(self._buffer)
+        for index, event in enumerate(events):
+            if event.id == event_id:
+                return events[index + 1:]
+        return None
+
+    def _offer(self, subscriber: Subscriber, event: ChangeEvent) -> bool:
+        try:
+            subscriber.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self._close(subscriber, "overflow")
+            return False
+
+    def _close(self, subscriber: Subscriber, reason: str) -> None:
+        self._subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(_control_event(reason))
+
+    def _publish(self, event: ChangeEvent) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Change stream listener failed")
+        if event.collection not in PRE_IMAGE_COLLECTIONS or _is_archive_delete(event, self._archive_horizon_days):
+            return
+        self._buffer.append(event)
+        for subscriber in list(self._subscribers):
+            if subscriber.matches(event):
+                self._offer(subscriber, event)
+
+    def _reset(self) -> None:
+        self._resume_token = None
+        self._buffer.clear()
+        for subscriber in list(self._subscribers):
+            self._offer(subscriber, _control_event("reset"))
+
+    async def _enable_pre_images(self) -> bool:
+        """
+        Turn on pre-images so delete events still tell us their flight and date.
+
+        Needs MongoDB 6.0+; without it deletes only reach unfiltered subscribers.
+        """
+        for collection in self._collections:
+            if collection not in PRE_IMAGE_COLLECTIONS:
+                continue
+            try:
+                await self._db.command("collMod", collection, changeStreamPreAndPostImages={"enabled": True})
+            except OperationFailure as e:
+                if e.code != NAMESPACE_NOT_FOUND:
+                    logger.warning("Could not enable change stream pre-images on %s: %s", collection, e)
+                    return False
+                try:
+                    await self._db.create_collection(collection, changeStreamPreAndPostImages={"enabled": True})
+                except CollectionInvalid:
+                    pass
+        return True
+
+    def _remember_flight_date(self, flight_id: str, date: Optional[str]) -> None:
+        if date is None:
+            return
+        self._flight_dates[flight_id] = date
+        self._flight_dates.move_to_end(flight_id)
+        if len(self._flight_dates) > FLIGHT_DATE_CACHE_SIZE:
+            self._flight_dates.popitem(last=False)
+
+    async def _flight_date(self, flight_id: Optional[str]) -> Optional[str]:
+        """
+        Date of a flight, from flight events seen so far or looked up once.
+        """
+        if not flight_id or not ObjectId.is_valid(flight_id):
+            return None
+        date = self._flight_dates.get(flight_id)
+        if date is not None:
+            self._flight_dates.move_to_end(flight_id)
+            return date
+        for collection in ("flights", "flights_archive"):
+            flight = await self._db[collection].find_one({"_id": ObjectId(flight_id)}, {"date_of_flight": 1})
+            if flight is not None:
+                self._remember_flight_date(flight_id, flight.get("date_of_flight"))
+                return flight.get("date_of_flight")
+        return None
+
+    async def _to_event(self, change: dict) -> ChangeEvent:
+        collection = change["ns"]["coll"]
+        operation = change["operationType"]
+        document_id = str(change["documentKey"]["_id"])
+        document = change.get("fullDocument")
+        # Deletes have no document, only the pre-image when it is enabled.
+        known = document if document is not None else change.get("fullDocumentBeforeChange")
+
+        if collection == "flights":
+            flight_id = document_id
+            date_of_flight = known.get("date_of_flight") if known else self._flight_dates.get(flight_id)
+            self._remember_flight_date(flight_id, date_of_flight)
+        elif collection == "reservations":
+            flight_id = known.get("flight_id") if known else None
+            date_of_flight = await self._flight_date(flight_id)
+        else:
+            return ChangeEvent(change["_id"]["_data"], collection, operation, document_id=document_id)
+
+        if document is not None:
+            document = dict(document)
+            document["id"] = str(document.pop("_id"))
+
+        event_id = change["_id"]["_data"]
+        payload = json.dumps({
+            "id": event_id,
+            "collection": collection,
+            "operation": operation,
+            "document_id": document_id,
+            "flight_id": flight_id,
+            "date_of_flight": date_of_flight,
+            "document": document,
+        }, default=str)
+        return ChangeEvent(event_id, collection, operation, flight_id, date_of_flight, payload, document_id)
+
+    async def _run(self) -> None:
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": self._collections},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+        }}]
+        try:
+            self._pre_images = await self._enable_pre_images()
+        except PyMongoError as e:
+            logger.warning("Could not enable change stream pre-images: %s", e)
+        options = {"full_document": "updateLookup"}
+        if self._pre_images:
+            options["full_document_before_change"] = "whenAvailable"
+        while True:
+            try:
+                async with self._db.watch(pipeline, resume_after=self._resume_token, **options) as stream:
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        self._publish(await self._to_event(change))
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_NOT_SUPPORTED:
+                    logger.error("Change streams require a replica set; live flight updates are disabled")
+                    return
+                if e.code == CHANGE_STREAM_HISTORY_LOST:
+                    logger.warning("Change stream history lost, restarting from now")
+                    self._reset()
+                else:
+                    logger.warning("Change stream failed: %s", e)
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+            except PyMongoError as e:
+                logger.warning("Change stream failed: %s", e)
+                await asyncio.sleep(RETRY_DELAY_SECONDS)
+
+
+def _is_archive_delete(event: ChangeEvent, horizon_days: int = ARCHIVE_HORIZON_DAYS) -> bool:
+    """
+    Deletes of departed flights and their reservations come from the archiver.
+
+    They are moves to the archive tier, not schedule changes, and a single run
+    would otherwise flood and overflow every subscriber. Without pre-images
+    (MongoDB < 6.0) a reservation delete carries no flight or date, and a flight
+    delete only has one if the flight was seen earlier, so archiver runs still
+    reach unfiltered subscribers there.
+    """
+    return (
+        event.operation == "delete"
+        and event.date_of_flight is not None
+        and event.date_of_flight < archive_cutoff(horizon_days)
+    )
@@ -1,5 +1,143 @@
-from fastapi import FastAPI, Request
+import base64
+from collections.abc import Mapping
+
+import bson
+from bson import Timestamp
+from fastapi import FastAPI, Request, HTTPException
+from pymongo import read_preferences
+
+CAUSAL_TOKEN_HEADER = "X-Causal-Token"
+
+# Read preference per endpoint; endpoints not listed read from the primary.
+READ_PREFERENCES = {
+    "list_flights": "secondaryPreferred",
+    "get_flights_by_date": "secondaryPreferred",
+    "list_passports": "secondaryPreferred",
+    "search_passports": "secondaryPreferred",
+    "list_clients": "secondaryPreferred",
+    "search_clients": "secondaryPreferred",
+    "list_reservations": "secondaryPreferred",
+}
+# The driver rejects values below 90 seconds.
+MAX_STALENESS_SECONDS = 90
+
+_READ_PREFERENCE_MODES = {
+    "primary": read_preferences.Primary,
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
 
 
 async def get_db(request: Request):
     return request.app.state.db
+
+
+async def get_existence(request: Request):
+    return request.app.state.existence
+
+
+def read_db(endpoint: str):
+    """
+    Build a dependency returning the database configured with the endpoint's read preference.
+    """
+    mode = READ_PREFERENCES.get(endpoint, "primary")
+    if mode == "primary":
+        preference = read_preferences.Primary()
+    else:
+        preference = _READ_PREFERENCE_MODES[mode](max_staleness=MAX_STALENESS_SECONDS)
+    cache = {}
+
+    async def dependency(request: Request):
+        db = request.app.state.db
+        if cache.get("base") is not db:
+            cache["base"] = db
+            cache["db"] = db.with_options(read_preference=preference)
+        return cache["db"]
+
+    return dependency
+
+
+def encode_causal_token(session) -> str | None:
+    if session.operation_time is None:
+        return None
+    raw = bson.encode({"operationTime": session.operation_time, "clusterTime": session.cluster_time})
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_causal_token(token: str) -> tuple[Timestamp, Mapping | None]:
+    """
+    Decode an X-Causal-Token, raising ValueError unless it has the shape the driver accepts.
+    """
+    try:
+        document = bson.decode(base64.urlsafe_b64decode(token.encode()))
+    except Exception as e:
+        raise ValueError(f"undecodable token: {e}")
+    operation_time = document.get("operationTime")
+    if not isinstance(operation_time, Timestamp):
+        raise ValueError("operationTime missing")
+    cluster_time = document.get("clusterTime")
+    if cluster_time is not None and not (
+            isinstance(cluster_time, Mapping) and isinstance(cluster_time.get("clusterTime"), Timestamp)
+    ):
+        raise ValueError("clusterTime malformed")
+    return operation_time, cluster_time
+
+
+async def get_session(request: Request):
+    """
+    Start a causally consistent session for the request.
+
+    If the client echoes the X-Causal-Token header returned by an earlier write,
+    reads in this session wait until that write is visible, even on a secondary.
+    """
+    token = request.headers.get(CAUSAL_TOKEN_HEADER)
+    advance = None
+    if token:
+        try:
+            advance = decode_causal_token(token)
+        except Exception:
+            raise HTTPException(status_code=400, detail=f"Invalid {CAUSAL_TOKEN_HEADER} header")
+
+    session = await request.app.state.mongodb_client.start_session(causal_consistency=True)
+    if advance is not None:
+        operation_time, cluster_time = advance
+        try:
+            if cluster_time is not None:
+                session.advance_cluster_time(cluster_time)
+            session.advance_operation_time(operation_time)
+        except (TypeError, ValueError):
+            await session.end_session()
+            raise HTTPException(status_code=400, detail=f"Invalid {CAUSAL_TOKEN_HEADER} header")
+    request.state.mongo_session = session
+    try:
+        yield session
+    finally:
+        await session.end_session()
+
+
+class CausalTokenMiddleware:
+    """
+    Return the session's operation time to the client as X-Causal-Token.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start":
+                session = scope.get("state", {}).get("mongo_session")
+                token = encode_causal_token(session) if session is not None else None
+                if token:
+                    headers = list(message.get("headers", []))
+                    headers.append((CAUSAL_TOKEN_HEADER.lower().encode(), token.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_token)
@@ -0,0 +1,289 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+INDEXED_COLLECTIONS = ("flights", "clients", "passports")
+BLOOM_ERROR_RATE = 0.01
+BLOOM_MIN_CAPACITY = 10_000
+POSITIVE_CACHE_SIZE = 10_000
+# Backstop for deletes made by other workers that never reach us through the
+# change stream (e.g. on a standalone server without change streams).
+POSITIVE_CACHE_TTL_SECONDS = 30.0
+SEED_BATCH_SIZE = 10_000
+# IDs generated this close to (or after) the seed are never rejected from the
+# filter alone: another worker may have inserted them after we scanned.
+CLOCK_SKEW = timedelta(seconds=5)
+
+_NOT_FOUND_LABELS = {"flights": "Flight", "clients": "Client", "passports": "Passport"}
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over byte strings using double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: bytes) -> Iterable[int]:
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: bytes) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    @property
+    def estimated_false_positive_rate(self) -> float:
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class ExistenceIndex:
+    """
+    Answers "does this _id exist?" for one collection without touching Mongo when possible.
+
+    A Bloom filter rejects definite negatives and a small LRU cache confirms
+    recently seen positives; everything else has to be checked in Mongo.
+    Deletes cannot be removed from a Bloom filter, so they only leave the
+    positive cache and turn into false positives until the next reseed.
+    Cached positives expire after a short TTL, so a delete this process was
+    never told about cannot keep an ID alive.
+    """
+
+    def __init__(
+            self,
+            collection: str,
+            cache_size: int = POSITIVE_CACHE_SIZE,
+            cache_ttl: float = POSITIVE_CACHE_TTL_SECONDS,
+    ):
+        self.collection = collection
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._cache: OrderedDict[ObjectId, float] = OrderedDict()
+        self._bloom: Optional[BloomFilter] = None
+        self._seeding: Optional[BloomFilter] = None
+        self._trusted_before: Optional[datetime] = None
+        self.stats = {"lookups": 0, "cache_hits": 0, "rejected": 0, "mongo_checks": 0, "false_positives": 0}
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    async def seed(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Rebuild the filter from every _id currently in the collection.
+        """
+        started = datetime.now(timezone.utc)
+        count = await db[self.collection].estimated_document_count()
+        self._seeding = BloomFilter(max(count * 2, BLOOM_MIN_CAPACITY))
+        cursor = db[self.collection].find({}, {"_id": 1}, batch_size=SEED_BATCH_SIZE)
+        try:
+            async for document in cursor:
+                self._seeding.add(_key(document["_id"]))
+            self._bloom = self._seeding
+            self._trusted_before = started - CLOCK_SKEW
+        finally:
+            self._seeding = None
+
+    @property
+    def needs_reseed(self) -> bool:
+        return self._bloom is not None and self._bloom.count > self._bloom.capacity
+
+    def add(self, object_id: ObjectId) -> None:
+        for bloom in (self._bloom, self._seeding):
+            if bloom is not None:
+                bloom.add(_key(object_id))
+        self._remember(object_id)
+
+    def discard(self, object_id: ObjectId) -> None:
+        self._cache.pop(object_id, None)
+
+    def _remember(self, object_id: ObjectId) -> None:
+        self._cache[object_id] = time.monotonic() + self._cache_ttl
+        self._cache.move_to_end(object_id)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _definitely_missing(self, object_id: ObjectId) -> bool:
+        if self._bloom is None or object_id.generation_time >= self._trusted_before:
+            return False
+        return _key(object_id) not in self._bloom
+
+    def classify(self, object_id: ObjectId) -> Optional[bool]:
+        """
+        True if known to exist, False if known to be missing, None if Mongo must decide.
+        """
+        self.stats["lookups"] += 1
+        expires = self._cache.get(object_id)
+        if expires is not None:
+            if expires > time.monotonic():
+                self._cache.move_to_end(object_id)
+                self.stats["cache_hits"] += 1
+                return True
+            del self._cache[object_id]
+        if self._definitely_missing(object_id):
+            self.stats["rejected"] += 1
+            return False
+        return None
+
+    def record_checked(self, object_id: ObjectId, exists: bool) -> None:
+        self.stats["mongo_checks"] += 1
+        if exists:
+            self._remember(object_id)
+        elif self._bloom is not None and object_id.generation_time < self._trusted_before:
+            self.stats["false_positives"] += 1
+
+    def report(self) -> dict:
+        checked = self.stats["mongo_checks"]
+        return {
+            "ready": self.ready,
+            "items": self._bloom.count if self._bloom else 0,
+            "capacity": self._bloom.capacity if self._bloom else 0,
+            "bloom_bytes": self._bloom.memory_bytes if self._bloom else 0,
+            "cached_positives": len(self._cache),
+            "estimated_false_positive_rate": self._bloom.estimated_false_positive_rate if self._bloom else None,
+            "observed_false_positive_rate": self.stats["false_positives"] / checked if checked else None,
+            **self.stats,
+        }
+
+
+class ExistenceIndexes:
+    """
+    Existence indexes for every collection referenced by foreign keys.
+    """
+
+    def __init__(self, collections: Iterable[str] = INDEXED_COLLECTIONS):
+        self._indexes = {collection: ExistenceIndex(collection) for collection in collections}
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __getitem__(self, collection: str) -> ExistenceIndex:
+        return self._indexes[collection]
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Seed all filters in the background; until then every check goes to Mongo.
+        """
+        self._db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self.seed(db))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def seed(self, db: AsyncIOMotorDatabase, collections: Optional[Iterable[str]] = None) -> None:
+        for collection in collections or list(self._indexes):
+            index = self._indexes[collection]
+            try:
+                await index.seed(db)
+                logger.info("Existence index for %s: %s", collection, index.report())
+            except PyMongoError as e:
+                logger.warning("Could not seed existence index for %s: %s", collection, e)
+
+    def add(self, collection: str, object_id: ObjectId) -> None:
+        index = self._indexes[collection]
+        index.add(object_id)
+        if index.needs_reseed and self._db is not None and (self._task is None or self._task.done()):
+            logger.info("Existence index for %s is over capacity, reseeding", collection)
+            self._task = asyncio.create_task(self.seed(self._db, [collection]))
+
+    def discard(self, collection: str, object_id: ObjectId) -> None:
+        self._indexes[collection].discard(object_id)
+
+    def on_change(self, event) -> None:
+        """
+        Apply inserts and deletes made by any worker, as seen on the change stream.
+        """
+        if event.collection not in self._indexes or not ObjectId.is_valid(event.document_id or ""):
+            return
+        if event.operation == "insert":
+            self.add(event.collection, ObjectId(event.document_id))
+        elif event.operation == "delete":
+            self.discard(event.collection, ObjectId(event.document_id))
+
+    async def find_missing(self, db: AsyncIOMotorDatabase, references: dict[str, list[str]]) -> dict[str, list[str]]:
+        """
+        Return the referenced IDs that do not exist, grouped by collection.
+
+        IDs the filters cannot settle are checked with one concurrent $in
+        query per collection.
+        """
+        missing: dict[str, list[str]] = {}
+        unresolved: dict[str, list[ObjectId]] = {}
+        for collection, ids in references.items():
+            index = self._indexes[collection]
+            for raw_id in dict.fromkeys(ids):
+                if not ObjectId.is_valid(raw_id):
+                    missing.setdefault(collection, []).append(raw_id)
+                    continue
+                object_id = ObjectId(raw_id)
+                known = index.classify(object_id)
+                if known is False:
+                    missing.setdefault(collection, []).append(raw_id)
+                elif known is None:
+                    unresolved.setdefault(collection, []).append(object_id)
+
+        collections = list(unresolved)
+        found = await asyncio.gather(*(
+            db[collection].find({"_id": {"$in": unresolved[collection]}}, {"_id": 1}).to_list(None)
+            for collection in collections
+        ))
+        for collection, documents in zip(collections, found):
+            existing = {document["_id"] for document in documents}
+            index = self._indexes[collection]
+            for object_id in unresolved[collection]:
+                exists = object_id in existing
+                index.record_checked(object_id, exists)
+                if not exists:
+                    missing.setdefault(collection, []).append(str(object_id))
+        return missing
+
+    async def require(self, db: AsyncIOMotorDatabase, references: dict[str, list[str]]) -> None:
+        """
+        Raise a 404 naming the first kind of referenced document that does not exist.
+        """
+        missing = await self.find_missing(db, references)
+        for collection, ids in missing.items():
+            raise HTTPException(
+                status_code=404,
+                detail=f"{_NOT_FOUND_LABELS.get(collection, collection)} not found: {', '.join(ids)}",
+            )
+
+    def report(self) -> dict:
+        return {collection: index.report() for collection, index in self._indexes.items()}
+
+
+def _key(object_id: ObjectId) -> bytes:
+    return object_id.binary
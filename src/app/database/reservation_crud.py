@@ -3,14 +3,16 @@ from pymongo.database import Database
 from fastapi import HTTPException
 from typing import List, Optional
 
+from src.app.database.archive import find_one_with_archive, find_with_archive
 
-async def create_reservation(db: Database, reservation_data: dict) -> dict:
+
+async def create_reservation(db: Database, reservation_data: dict, session=None) -> dict:
     """
     Create a new reservation in the database.
     """
     try:
-        result = await db["reservations"].insert_one(reservation_data)
-        reservation = await db["reservations"].find_one({"_id": result.inserted_id})
+        result = await db["reservations"].insert_one(reservation_data, session=session)
+        reservation = await db["reservations"].find_one({"_id": result.inserted_id}, session=session)
         if reservation:
             reservation["id"] = str(reservation.pop("_id"))
         return reservation
@@ -18,7 +20,7 @@ async def create_reservation(db: Database, reservation_data: dict) -> dict:
         raise HTTPException(status_code=400, detail=f"Error creating reservation: {str(e)}")
 
 
-async def get_reservation_by_id(db: Database, reservation_id: str) -> dict:
+async def get_reservation_by_id(db: Database, reservation_id: str, session=None) -> dict:
     """
     Retrieve a reservation by its ID.
     """
@@ -27,7 +29,7 @@ async def get_reservation_by_id(db: Database, reservation_id: str) -> dict:
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid reservation ID format")
 
-    reservation = await db["reservations"].find_one({"_id": object_id})
+    reservation = await find_one_with_archive(db, "reservations", {"_id": object_id}, session)
     if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
 
@@ -35,17 +37,22 @@ async def get_reservation_by_id(db: Database, reservation_id: str) -> dict:
     return reservation
 
 
-async def get_all_reservations(db: Database, limit: int = 10, skip: int = 0) -> List[dict]:
+async def get_all_reservations(
+        db: Database, limit: int = 10, skip: int = 0, session=None, include_archived: bool = False
+) -> List[dict]:
     """
-    Retrieve all reservations with pagination.
+    Retrieve all reservations with pagination, optionally including archived ones.
     """
-    reservations = await db["reservations"].find().skip(skip).limit(limit).to_list(length=limit)
+    if include_archived:
+        reservations = await find_with_archive(db, "reservations", {}, skip, limit, session)
+    else:
+        reservations = await db["reservations"].find(session=session).skip(skip).limit(limit).to_list(length=limit)
     for reservation in reservations:
         reservation["id"] = str(reservation.pop("_id"))
     return reservations
 
 
-async def update_reservation(db: Database, reservation_id: str, update_data: dict) -> dict:
+async def update_reservation(db: Database, reservation_id: str, update_data: dict, session=None) -> dict:
     """
     Update a reservation by its ID.
     """
@@ -54,16 +61,16 @@ async def update_reservation(db: Database, reservation_id: str, update_data: dic
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid reservation ID format")
 
-    result = await db["reservations"].update_one({"_id": object_id}, {"$set": update_data})
+    result = await db["reservations"].update_one({"_id": object_id}, {"$set": update_data}, session=session)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Reservation not found or no changes made")
 
-    updated_reservation = await db["reservations"].find_one({"_id": object_id})
+    updated_reservation = await db["reservations"].find_one({"_id": object_id}, session=session)
     updated_reservation["id"] = str(updated_reservation.pop("_id"))
     return updated_reservation
 
 
-async def delete_reservation(db: Database, reservation_id: str) -> dict:
+async def delete_reservation(db: Database, reservation_id: str, session=None) -> dict:
     """
     Delete a reservation by its ID.
     """
@@ -72,10 +79,10 @@ async def delete_reservation(db: Database, reservation_id: str) -> dict:
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid reservation ID format")
 
-    reservation = await db["reservations"].find_one({"_id": object_id})
+    reservation = await db["reservations"].find_one({"_id": object_id}, session=session)
     if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
 
-    await db["reservations"].delete_one({"_id": object_id})
+    await db["reservations"].delete_one({"_id": object_id}, session=session)
     reservation["id"] = str(reservation.pop("_id"))
     return reservation
@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "jobs"
+RESULTS_BUCKET = "job_results"
+MAX_CONCURRENT_JOBS = 2
+PROCESS_POOL_SIZE = 2
+MAX_ATTEMPTS = 3
+LEASE_SECONDS = 60
+POLL_INTERVAL_SECONDS = 5.0
+
+
+class JobContext:
+    """
+    What a running job handler can use: the database, progress reporting,
+    the process pool for CPU-heavy steps and GridFS for results.
+    """
+
+    def __init__(self, runner: "JobRunner", job: dict):
+        self._runner = runner
+        self.job_id: ObjectId = job["_id"]
+        self.params: dict = job.get("params", {})
+        self.db: AsyncIOMotorDatabase = runner.db
+        self.fs = AsyncIOMotorGridFSBucket(runner.db, bucket_name=RESULTS_BUCKET)
+
+    async def progress(self, done: int, total: Optional[int] = None) -> None:
+        update = {"progress.done": done}
+        if total is not None:
+            update["progress.total"] = total
+        await self.db[COLLECTION].update_one({"_id": self.job_id, "owner": self._runner.owner}, {"$set": update})
+
+    async def run_cpu(self, fn: Callable, *args):
+        """
+        Run a picklable, module-level function in the process pool.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._runner.executor, fn, *args)
+
+
+Handler = Callable[[JobContext], Awaitable[Optional[dict]]]
+
+
+class JobRunner:
+    """
+    Runs jobs persisted in the jobs collection with bounded concurrency.
+
+    Jobs are claimed with a lease that is renewed while they run. A job whose
+    lease ran out (its process died or was restarted) is claimed again by any
+    worker, so unfinished jobs resume after a restart. Handlers must therefore
+    be safe to run again from the start.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, handlers: dict[str, Handler], concurrency: int = MAX_CONCURRENT_JOBS):
+        self.db = db
+        self._handlers = handlers
+        self._slots = asyncio.Semaphore(concurrency)
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: dict[ObjectId, asyncio.Task] = {}
+
+    @property
+    def owner(self) -> str:
+        return self._owner
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_SIZE, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def ensure_indexes(self) -> None:
+        await self.db[COLLECTION].create_index([("status", 1), ("created_at", 1)])
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, job_type: str, params: dict) -> dict:
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job = {
+            "type": job_type,
+            "params": params,
+            "status": "queued",
+            "progress": {"done": 0, "total": None},
+            "attempts": 0,
+            "created_at": datetime.now(timezone.utc),
+        }
+        result = await self.db[COLLECTION].insert_one(job)
+        job["_id"] = result.inserted_id
+        self._wakeup.set()
+        return job
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.db[COLLECTION].find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued"},
+                    {"status": "running", "lease_expires": {"$lt": now}},
+                ],
+                # A job we are still stopping after losing its lease must not start twice here.
+                "_id": {"$nin": list(self._running)},
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "owner": self._owner,
+                    "lease_expires": now + timedelta(seconds=LEASE_SECONDS),
+                    "started_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _run(self) -> None:
+        try:
+            await self.ensure_indexes()
+        except PyMongoError as e:
+            logger.warning("Could not create job indexes: %s", e)
+        while True:
+            await self._slots.acquire()
+            try:
+                job = await self._claim()
+            except PyMongoError as e:
+                logger.warning("Could not claim a job: %s", e)
+                job = None
+            if job is None:
+                self._slots.release()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._execute(job))
+            self._running[job["_id"]] = task
+            task.add_done_callback(lambda _, job_id=job["_id"]: self._finished(job_id))
+
+    def _finished(self, job_id: ObjectId) -> None:
+        self._running.pop(job_id, None)
+        self._slots.release()
+
+    async def _heartbeat(self, job_id: ObjectId, handler: asyncio.Task) -> None:
+        """
+        Renew the lease until cancelled; returns after cancelling the handler
+        if the lease was lost, as another worker may claim the job any moment.
+        """
+        loop = asyncio.get_running_loop()
+        interval = LEASE_SECONDS / 3
+        renewed = loop.time()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                result = await self.db[COLLECTION].update_one(
+                    {"_id": job_id, "owner": self._owner, "status": "running"},
+                    {"$set": {"lease_expires": datetime.now(timezone.utc) + timedelta(seconds=LEASE_SECONDS)}},
+                )
+            except PyMongoError as e:
+                logger.warning("Could not renew the lease of job %s: %s", job_id, e)
+                # Retry while a later renewal can still land before the lease runs out.
+                if loop.time() - renewed + interval < LEASE_SECONDS:
+                    continue
+                logger.error("Lease of job %s ran out, stopping it", job_id)
+            else:
+                if result.matched_count:
+                    renewed = loop.time()
+                    continue
+                logger.error("Job %s was claimed by another worker, stopping it", job_id)
+            handler.cancel()
+            return
+
+    async def _execute(self, job: dict) -> None:
+        job_id = job["_id"]
+        if job["attempts"] > MAX_ATTEMPTS:
+            await self._finish(job_id, "failed", error=f"Gave up after {MAX_ATTEMPTS} attempts")
+            return
+
+        handler = asyncio.create_task(self._handlers[job["type"]](JobContext(self, job)))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, handler))
+        try:
+            result = await handler
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                # The lease is gone: the job belongs to whoever claims it next.
+                return
+            # Shutting down: hand the job back so it resumes right away elsewhere.
+            await asyncio.shield(self.db[COLLECTION].update_one(
+                {"_id": job_id, "owner": self._owner},
+                {"$set": {"status": "queued"}, "$unset": {"owner": "", "lease_expires": ""}, "$inc": {"attempts": -1}},
+            ))
+            raise
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            await self._finish(job_id, "failed", error=str(e))
+        else:
+            await self._finish(job_id, "completed", result=result)
+        finally:
+            heartbeat.cancel()
+
+    async def _finish(self, job_id: ObjectId, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        updated = await self.db[COLLECTION].update_one(
+            {"_id": job_id, "owner": self._owner},
+            {
+                "$set": {
+                    "status": status,
+                    "result": result,
+                    "error": error,
+                    "finished_at": datetime.now(timezone.utc),
+                },
+                "$unset": {"owner": "", "lease_expires": ""},
+            },
+        )
+        if updated.matched_count == 0:
+            logger.warning("Job %s is no longer ours, dropping its %s result", job_id, status)
@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+
+from src.app.jobs.runner import JobContext
+
+EXPORT_BATCH_SIZE = 1000
+UPDATE_BATCH_SIZE = 1000
+REPORT_COLLECTION = "reservation_report"
+EXPORT_FORMATS = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+CSV_FIELDS = ["id", "status", "date_of_registration", "total_cost", "flight_id", "client_id", "passport_id"]
+# Only these fields may be used to select reservations.
+FILTER_FIELDS = ("status", "flight_id", "client_id")
+
+
+def _reservation_filter(params: dict) -> dict:
+    given = params.get("filter") or {}
+    unknown = set(given) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unsupported filter fields: {', '.join(sorted(unknown))}")
+    return {k: str(v) for k, v in given.items()}
+
+
+def encode_reservations(rows: list[dict], export_format: str, header: bool) -> bytes:
+    """
+    Serialize a batch of reservations; runs in the process pool.
+    """
+    if export_format == "jsonl":
+        return "".join(json.dumps(row, default=str) + "\n" for row in rows).encode()
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    for row in rows:
+        writer.writerow({**row, "passport_id": ";".join(row.get("passport_id") or [])})
+    return buffer.getvalue().encode()
+
+
+async def export_reservations(ctx: JobContext) -> dict:
+    """
+    Export reservations to a GridFS file as JSON lines or CSV.
+    """
+    export_format = ctx.params.get("format", "jsonl")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    query = _reservation_filter(ctx.params)
+
+    total = await ctx.db.reservations.count_documents(query)
+    await ctx.progress(0, total)
+
+    filename = f"reservations-{ctx.job_id}.{export_format}"
+    content_type = EXPORT_FORMATS[export_format]
+    upload = ctx.fs.open_upload_stream(
+        filename, metadata={"job_id": ctx.job_id, "content_type": content_type}
+    )
+    done = 0
+    try:
+        cursor = ctx.db.reservations.find(query).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+        batch = []
+        async for reservation in cursor:
+            reservation["id"] = str(reservation.pop("_id"))
+            batch.append(reservation)
+            if len(batch) == EXPORT_BATCH_SIZE:
+                await upload.write(await ctx.run_cpu(encode_reservations, batch, export_format, done == 0))
+                done += len(batch)
+                batch = []
+                await ctx.progress(done)
+        if batch or done == 0:
+            await upload.write(await ctx.run_cpu(encode_reservations, batch, export_format, done == 0))
+            done += len(batch)
+        await upload.close()
+    except BaseException:
+        await upload.abort()
+        raise
+    await ctx.progress(done)
+
+    return {
+        "file_id": str(upload._id),
+        "filename": filename,
+        "content_type": content_type,
+        "rows": done,
+    }
+
+
+async def rebuild_reservation_report(ctx: JobContext) -> dict:
+    """
+    Rebuild per-flight reservation totals into the reservation_report collection.
+    """
+    await ctx.progress(0, 1)
+    await ctx.db.reservations.aggregate([
+        {"$group": {
+            "_id": "$flight_id",
+            "reservations": {"$sum": 1},
+            "passengers": {"$sum": {"$size": {"$ifNull": ["$passport_id", []]}}},
+            "total_cost": {"$sum": "$total_cost"},
+        }},
+        {"$out": REPORT_COLLECTION},
+    ]).to_list(None)
+    flights = await ctx.db[REPORT_COLLECTION].estimated_document_count()
+    await ctx.progress(1)
+    return {"collection": REPORT_COLLECTION, "flights": flights}
+
+
+async def update_reservation_status(ctx: JobContext) -> dict:
+    """
+    Set the status of every matching reservation, in batches.
+
+    Already updated reservations no longer match, so a resumed job continues
+    where the previous attempt stopped.
+    """
+    status = ctx.params.get("status")
+    if not isinstance(status, str) or not status:
+        raise ValueError("A target 'status' is required")
+    query = _reservation_filter(ctx.params)
+    if "status" in query:
+        query["status"] = {"$eq": query["status"], "$ne": status}
+    else:
+        query["status"] = {"$ne": status}
+
+    total = await ctx.db.reservations.count_documents(query)
+    await ctx.progress(0, total)
+    done = 0
+    while True:
+        batch = await ctx.db.reservations.find(query, {"_id": 1}).limit(UPDATE_BATCH_SIZE).to_list(UPDATE_BATCH_SIZE)
+        if not batch:
+            break
+        result = await ctx.db.reservations.update_many(
+            {"_id": {"$in": [r["_id"] for r in batch]}}, {"$set": {"status": status}}
+        )
+        done += result.modified_count
+        await ctx.progress(done)
+    return {"updated": done}
+
+
+HANDLERS = {
+    "export_reservations": export_reservations,
+    "rebuild_reservation_report": rebuild_reservation_report,
+    "update_reservation_status": update_reservation_status,
+}
@@ -0,0 +1,200 @@
+import asyncio
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MINIMUM_SIZE = 1024
+# Bodies at least this large are compressed in a worker thread.
+OFFLOAD_SIZE = 64 * 1024
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+DEFAULT_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+# Per-route levels, matched by path prefix. Whole-day departure boards are
+# requested over and over and cached, so they get a stronger level.
+ROUTE_LEVELS = [
+    ("/api/v1/flights/flights/date/", {"zstd": 10, "br": 9, "gzip": 9}),
+]
+
+SKIPPED_CONTENT_TYPES = ("text/event-stream",)
+
+
+def _compress_gzip(body: bytes, level: int) -> bytes:
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+COMPRESSORS: dict[str, Callable[[bytes, int], bytes]] = {"gzip": _compress_gzip}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body, level: brotli.compress(body, quality=level)
+if zstandard is not None:
+    COMPRESSORS["zstd"] = lambda body, level: zstandard.ZstdCompressor(level=level).compress(body)
+
+# Server preference when the client accepts several encodings equally.
+PREFERENCE = ("zstd", "br", "gzip")
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported encoding from an Accept-Encoding header.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in PREFERENCE:
+        if encoding not in COMPRESSORS:
+            continue
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def route_levels(path: str) -> dict[str, int]:
+    for prefix, levels in ROUTE_LEVELS:
+        if path.startswith(prefix):
+            return levels
+    return DEFAULT_LEVELS
+
+
+class CompressedBodyCache:
+    """
+    LRU cache of compressed bodies keyed by a digest of the uncompressed body.
+
+    Identical bodies, such as a cached departure board served to many clients,
+    are only compressed once per encoding and level.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value: bytes) -> None:
+        if len(value) > self._max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = value
+        self._size += len(value)
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+
+class CompressionMiddleware:
+    """
+    Compress buffered responses with gzip, brotli or zstd as negotiated by the client.
+
+    Streaming responses (several body chunks) and event streams pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE, cache: Optional[CompressedBodyCache] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache if cache is not None else CompressedBodyCache()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        level = route_levels(scope["path"]).get(encoding, DEFAULT_LEVELS[encoding])
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or content_type.startswith(SKIPPED_CONTENT_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = await self._compress(body, encoding, level)
+            headers = [
+                (name, value) for name, value in start_message.get("headers", [])
+                if name.lower() not in (b"content-length", b"vary")
+            ]
+            vary = [value for name, value in start_message.get("headers", []) if name.lower() == b"vary"]
+            vary.append(b"Accept-Encoding")
+            headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"content-length", str(len(compressed)).encode()))
+            headers.append((b"vary", b", ".join(vary)))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _compress(self, body: bytes, encoding: str, level: int) -> bytes:
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding, level)
+        compressed = self.cache.get(key)
+        if compressed is not None:
+            return compressed
+
+        compressor = COMPRESSORS[encoding]
+        if len(body) >= OFFLOAD_SIZE:
+            compressed = await asyncio.to_thread(compressor, body, level)
+        else:
+            compressed = compressor(body, level)
+        self.cache.put(key, compressed)
+        return compressed
@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+COLLECTION = "idempotency_keys"
+KEY_TTL_SECONDS = 24 * 60 * 60
+MAX_KEY_LENGTH = 255
+# How long a duplicate waits for a request still running in another worker.
+WAIT_TIMEOUT_SECONDS = 30.0
+POLL_INTERVAL_SECONDS = 0.05
+MAX_POLL_INTERVAL_SECONDS = 1.0
+# A claim is only held while its owner keeps renewing it; once it lapses a
+# duplicate takes the key over and runs the request itself.
+LOCK_SECONDS = 10.0
+
+_SKIPPED_HEADERS = {b"content-length", b"date", b"server"}
+
+
+async def ensure_idempotency_indexes(db: AsyncIOMotorDatabase) -> None:
+    await db[COLLECTION].create_index("created_at", expireAfterSeconds=KEY_TTL_SECONDS)
+
+
+class IdempotencyMiddleware:
+    """
+    Execute a POST carrying an Idempotency-Key header at most once.
+
+    The first request's response is stored in a TTL-indexed collection. Duplicates
+    that arrive while it is running wait for its result, later ones are answered
+    from the stored response. Server errors are not stored, so they can be retried.
+    If the worker running the first request dies, its claim stops being renewed
+    and a waiting duplicate takes it over.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        key = None
+        for name, value in scope["headers"]:
+            if name == IDEMPOTENCY_HEADER:
+                key = value.decode("latin-1").strip()
+                break
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _send_error(send, 400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+            return
+
+        body = await _read_body(receive)
+        record_id = f"{scope['path']} {key}"
+        fingerprint = hashlib.sha256(body).hexdigest()
+        db = scope["app"].state.db
+
+        in_flight = self._in_flight.get(record_id)
+        if in_flight is not None:
+            record = await asyncio.shield(in_flight)
+            await self._replay(send, record, fingerprint)
+            return
+
+        owner = uuid.uuid4().hex
+        claimed = False
+        try:
+            record = await db[COLLECTION].find_one({"_id": record_id})
+            if record is None:
+                await db[COLLECTION].insert_one({
+                    "_id": record_id,
+                    "fingerprint": fingerprint,
+                    "status": "in_progress",
+                    "owner": owner,
+                    "locked_until": _lock_deadline(),
+                    "created_at": datetime.now(timezone.utc),
+                })
+                claimed = True
+            elif record["status"] == "in_progress" and _lock_expired(record):
+                claimed = await _take_over(db, record_id, fingerprint, owner)
+        except DuplicateKeyError:
+            record = {"status": "in_progress"}
+        except PyMongoError as e:
+            logger.warning("Idempotency store unavailable, running request without it: %s", e)
+            await self.app(scope, _replay_receive(body, receive), send)
+            return
+
+        if not claimed and record is not None and record["status"] == "in_progress":
+            record = await self._wait_for(db, record_id, fingerprint, owner)
+            claimed = record is _CLAIMED
+        if not claimed:
+            await self._replay(send, record, fingerprint)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[record_id] = future
+        try:
+            record = await self._execute(
+                scope, _replay_receive(body, receive), send, db, record_id, fingerprint, owner
+            )
+            future.set_result(record)
+        except BaseException:
+            future.set_result(None)
+            await _forget(db, record_id, owner)
+            raise
+        finally:
+            self._in_flight.pop(record_id, None)
+
+    async def _execute(self, scope, receive, send, db, record_id: str, fingerprint: str, owner: str) -> Optional[dict]:
+        status = 500
+        headers = []
+        chunks = []
+
+        async def capture(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [
+                    [name, value] for name, value in message.get("headers", [])
+                    if name.lower() not in _SKIPPED_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        renewal = asyncio.create_task(_renew_lock(db, record_id, owner))
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            renewal.cancel()
+
+        if status >= 500:
+            await _forget(db, record_id, owner)
+            return None
+
+        record = {
+            "fingerprint": fingerprint,
+            "status": "completed",
+            "response_status": status,
+            "response_headers": headers,
+            "response_body": b"".join(chunks),
+        }
+        try:
+            result = await db[COLLECTION].update_one(
+                {"_id": record_id, "owner": owner},
+                {"$set": record, "$unset": {"owner": "", "locked_until": ""}},
+            )
+            if result.matched_count == 0:
+                logger.warning("Idempotency-Key %s was taken over before its response was stored", record_id)
+        except PyMongoError as e:
+            logger.warning("Could not store idempotent response for %s: %s", record_id, e)
+            await _forget(db, record_id, owner)
+        return record
+
+    async def _wait_for(self, db, record_id: str, fingerprint: str, owner: str) -> Optional[dict]:
+        """
+        Poll until the request holding the key finishes, or take the key over
+        (returning _CLAIMED) once its lock has lapsed.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + WAIT_TIMEOUT_SECONDS
+        interval = POLL_INTERVAL_SECONDS
+        while loop.time() < deadline:
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL_SECONDS)
+            record = await db[COLLECTION].find_one({"_id": record_id})
+            if record is None or record["status"] == "completed":
+                return record
+            if _lock_expired(record) and await _take_over(db, record_id, fingerprint, owner):
+                return _CLAIMED
+        return {"status": "in_progress"}
+
+    async def _replay(self, send, record: Optional[dict], fingerprint: str) -> None:
+        if record is None:
+            await _send_error(send, 409, "The original request with this Idempotency-Key failed; retry it")
+        elif record["status"] != "completed":
+            await _send_error(send, 409, "A request with this Idempotency-Key is still in progress")
+        elif record["fingerprint"] != fingerprint:
+            await _send_error(send, 422, "Idempotency-Key was already used with a different request body")
+        else:
+            body = bytes(record["response_body"])
+            headers = [(bytes(name), bytes(value)) for name, value in record["response_headers"]]
+            headers.append((b"content-length", str(len(body)).encode()))
+            headers.append((b"idempotent-replayed", b"true"))
+            await send({"type": "http.response.start", "status": record["response_status"], "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _replay_receive(body: bytes, receive):
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+_CLAIMED = {"status": "claimed"}
+
+
+def _lock_deadline() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=LOCK_SECONDS)
+
+
+def _lock_expired(record: dict) -> bool:
+    locked_until = record.get("locked_until")
+    if locked_until is None:
+        return True
+    if locked_until.tzinfo is None:
+        locked_until = locked_until.replace(tzinfo=timezone.utc)
+    return locked_until < datetime.now(timezone.utc)
+
+
+async def _take_over(db, record_id: str, fingerprint: str, owner: str) -> bool:
+    """
+    Claim a key whose owner stopped renewing it. Only one duplicate can win.
+    """
+    now = datetime.now(timezone.utc)
+    result = await db[COLLECTION].update_one(
+        {
+            "_id": record_id,
+            "status": "in_progress",
+            "fingerprint": fingerprint,
+            "$or": [{"locked_until": {"$lt": now}}, {"locked_until": {"$exists": False}}],
+        },
+        {"$set": {"owner": owner, "locked_until": _lock_deadline()}},
+    )
+    if result.modified_count:
+        logger.warning("Idempotency-Key %s was abandoned by its owner, running it again", record_id)
+    return result.modified_count == 1
+
+
+async def _renew_lock(db, record_id: str, owner: str) -> None:
+    while True:
+        await asyncio.sleep(LOCK_SECONDS / 3)
+        try:
+            await db[COLLECTION].update_one(
+                {"_id": record_id, "owner": owner, "status": "in_progress"},
+                {"$set": {"locked_until": _lock_deadline()}},
+            )
+        except PyMongoError as e:
+            logger.warning("Could not renew Idempotency-Key %s: %s", record_id, e)
+
+
+async def _forget(db, record_id: str, owner: str) -> None:
+    try:
+        await db[COLLECTION].delete_one({"_id": record_id, "owner": owner, "status": "in_progress"})
+    except PyMongoError as e:
+        logger.warning("Could not release Idempotency-Key %s: %s", record_id, e)
+
+
+async def _send_error(send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
 from pydantic import BaseModel
 
 
@@ -97,3 +97,55 @@ class ReservationFull(ReservationResponse):
 
     class Config:
         from_attributes = True
+
+
+# === Batch Schemas ===
+class BatchOperation(BaseModel):
+    op: Literal["create", "get", "update", "delete"]
+    resource: Literal["flights", "passports", "clients", "reservations"]
+    ref: Optional[str] = None
+    id: Optional[Union[str, Dict[str, str]]] = None
+    body: Optional[Dict[str, Any]] = None
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+    transaction: bool = False
+
+
+class BatchResult(BaseModel):
+    status: int
+    ref: Optional[str] = None
+    id: Optional[str] = None
+    body: Optional[Dict[str, Any]] = None
+    detail: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+
+
+# === Job Schemas ===
+class JobCreate(BaseModel):
+    type: Literal["export_reservations", "rebuild_reservation_report", "update_reservation_status"]
+    params: Dict[str, Any] = {}
+
+
+class JobProgress(BaseModel):
+    done: int = 0
+    total: Optional[int] = None
+
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    status: str
+    progress: JobProgress = JobProgress()
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -1,35 +1,136 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import signal
+import threading
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
 
-app = FastAPI()
+from src.app.database.archive import ARCHIVE_HORIZON_DAYS, Archiver
+from src.app.database.change_stream import ChangeStreamHub
+from src.app.database.database import CausalTokenMiddleware
+from src.app.database.existence import ExistenceIndexes
+from src.app.jobs.runner import JobRunner
+from src.app.jobs.tasks import HANDLERS
+from src.app.middleware.compression import CompressionMiddleware
+from src.app.middleware.idempotency import IdempotencyMiddleware, ensure_idempotency_indexes
 
 MONGODB_URI = "mongodb://127.0.0.1:27017"
 DATABASE_NAME = "airport"
 
+logger = logging.getLogger(__name__)
 
-@app.on_event("startup")
-async def startup_db():
-    app.state.mongodb_client = AsyncIOMotorClient(MONGODB_URI)
-    app.state.db = app.state.mongodb_client[DATABASE_NAME]
 
+def _close_streams_on_exit(hub: ChangeStreamHub):
+    """
+    Close live streams as soon as the server is told to exit.
+
+    uvicorn drains open connections before running lifespan shutdown, and SSE
+    or WebSocket streams never finish on their own, so without this every
+    restart would wait out the whole graceful timeout. The server's own
+    SIGINT/SIGTERM handlers are chained, not replaced. Returns a function
+    that restores them.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+
+    loop = asyncio.get_running_loop()
+    previous_handlers = {}
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
 
-@app.on_event("shutdown")
-async def shutdown_db():
-    app.state.mongodb_client.close()
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(hub.close_subscribers)
+            previous(signum, frame)
 
+        previous_handlers[sig] = previous
+        signal.signal(sig, handler)
 
-from src.app.api.flight import router as flight_router
-from src.app.api.passport import router as passport_router
-from src.app.api.client import router as client_router
-from src.app.api.reservation import router as reservation_router
+    def restore():
+        for sig, previous in previous_handlers.items():
+            signal.signal(sig, previous)
 
-app.include_router(flight_router, prefix="/api/v1/flights", tags=["Flights"])
-app.include_router(passport_router, prefix="/api/v1/passports", tags=["Passports"])
-app.include_router(client_router, prefix="/api/v1/clients", tags=["Clients"])
-app.include_router(reservation_router, prefix="/api/v1/reservations", tags=["Reservations"])
+    return restore
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open per-process resources.
+
+    This runs inside each worker process, so every worker gets its own Motor
+    client instead of inheriting one across a fork.
+    """
+    app.state.mongodb_client = AsyncIOMotorClient(MONGODB_URI)
+    app.state.db = app.state.mongodb_client[DATABASE_NAME]
+    try:
+        await ensure_idempotency_indexes(app.state.db)
+    except PyMongoError as e:
+        logger.warning("Could not create idempotency indexes: %s", e)
+    # The hub hides the archiver's deletes, so both must use the same horizon.
+    app.state.change_hub = ChangeStreamHub(app.state.db, archive_horizon_days=ARCHIVE_HORIZON_DAYS)
+    app.state.change_hub.start()
+    restore_signal_handlers = _close_streams_on_exit(app.state.change_hub)
+    app.state.existence = ExistenceIndexes()
+    app.state.existence.start(app.state.db)
+    app.state.change_hub.add_listener(app.state.existence.on_change)
+    app.state.archiver = Archiver(
+        app.state.db, horizon_days=ARCHIVE_HORIZON_DAYS, existence=app.state.existence
+    )
+    app.state.archiver.start()
+    app.state.jobs = JobRunner(app.state.db, HANDLERS)
+    app.state.jobs.start()
+    try:
+        yield
+    finally:
+        restore_signal_handlers()
+        await app.state.jobs.stop()
+        await app.state.archiver.stop()
+        await app.state.existence.stop()
+        await app.state.change_hub.stop()
+        app.state.mongodb_client.close()
+
 
-@app.get("/")
 async def root():
     return {"message": "Welcome to the Flight API"}
+
+
+async def existence_stats(request: Request):
+    """
+    Memory use and false-positive rates of the foreign-key existence filters.
+    """
+    return request.app.state.existence.report()
+
+
+def create_app() -> FastAPI:
+    from src.app.api.flight_stream import router as flight_stream_router
+    from src.app.api.flight import router as flight_router
+    from src.app.api.passport import router as passport_router
+    from src.app.api.client import router as client_router
+    from src.app.api.reservation import router as reservation_router
+    from src.app.api.batch import router as batch_router
+    from src.app.api.job import router as job_router
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(CausalTokenMiddleware)
+    app.add_middleware(IdempotencyMiddleware)
+    app.add_middleware(CompressionMiddleware)
+
+    app.include_router(flight_stream_router, prefix="/api/v1/flights", tags=["Flights"])
+    app.include_router(flight_router, prefix="/api/v1/flights", tags=["Flights"])
+    app.include_router(passport_router, prefix="/api/v1/passports", tags=["Passports"])
+    app.include_router(client_router, prefix="/api/v1/clients", tags=["Clients"])
+    app.include_router(reservation_router, prefix="/api/v1/reservations", tags=["Reservations"])
+    app.include_router(batch_router, prefix="/api/v1", tags=["Batch"])
+    app.include_router(job_router, prefix="/api/v1", tags=["Jobs"])
+
+    app.get("/")(root)
+    app.get("/stats/existence")(existence_stats)
+    return app
+
+
+app = create_app()
@@ -0,0 +1,46 @@
+import argparse
+import os
+
+import uvicorn
+
+
+def default_workers() -> int:
+    """
+    Number of CPUs this process may run on.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the Flight API with multiple worker processes.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="number of worker processes (default: number of available CPUs)",
+    )
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=30,
+        help="seconds to wait for in-flight requests on shutdown",
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    # Workers are spawned, not forked, and each one builds the app through the
+    # factory, so the Motor client is always created inside the worker itself.
+    uvicorn.run(
+        "src.main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers or default_workers(),
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
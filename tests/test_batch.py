@@ -0,0 +1,108 @@
+import pytest
+from fastapi import HTTPException
+
+from src.app.api.batch import _external_references, _group, _prepare, _resolve
+from src.app.schemas.shema import BatchOperation
+
+PASSPORT = {"passport_number": "AB123", "firstname": "Ann", "lastname": "Lee"}
+FLIGHT = {"departure_time": "10:30", "date_of_flight": "2026-10-19"}
+
+
+def _client(passport_id):
+    return {"mail": "a@b.c", "phone_number": "123", "nick_name": "ann", "passport_id": passport_id}
+
+
+def _reservation(flight_id, client_id, passport_ids):
+    return {
+        "status": "booked", "date_of_registration": "2026-10-01", "total_cost": 100,
+        "flight_id": flight_id, "client_id": client_id, "passport_id": passport_ids,
+    }
+
+
+def _op(op, resource, ref=None, id=None, body=None):
+    return BatchOperation(op=op, resource=resource, ref=ref, id=id, body=body)
+
+
+def _status(exc_info) -> int:
+    return exc_info.value.status_code
+
+
+def test_resolve_replaces_nested_refs():
+    refs = {"p": "p-id", "c": "c-id"}
+    body = {"client_id": {"$ref": "c"}, "passport_id": [{"$ref": "p"}, "other"], "total_cost": 1}
+
+    assert _resolve(body, refs, 0) == {"client_id": "c-id", "passport_id": ["p-id", "other"], "total_cost": 1}
+
+
+def test_resolve_rejects_unknown_ref():
+    with pytest.raises(HTTPException) as exc_info:
+        _resolve({"$ref": "missing"}, {}, 3)
+    assert _status(exc_info) == 400
+    assert "Operation 3" in exc_info.value.detail
+
+
+def test_refs_resolve_to_ids_created_earlier():
+    steps = _prepare([
+        _op("create", "passports", ref="p", body=PASSPORT),
+        _op("create", "clients", ref="c", body=_client({"$ref": "p"})),
+        _op("get", "clients", id={"$ref": "c"}),
+    ])
+
+    assert steps[1].data["passport_id"] == str(steps[0].object_id)
+    assert steps[2].object_id == steps[1].object_id
+
+
+def test_forward_ref_is_unknown():
+    with pytest.raises(HTTPException) as exc_info:
+        _prepare([
+            _op("create", "clients", body=_client({"$ref": "p"})),
+            _op("create", "passports", ref="p", body=PASSPORT),
+        ])
+    assert _status(exc_info) == 400
+
+
+def test_duplicate_ref_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        _prepare([
+            _op("create", "passports", ref="p", body=PASSPORT),
+            _op("create", "passports", ref="p", body=PASSPORT),
+        ])
+    assert _status(exc_info) == 400
+    assert "duplicate ref" in exc_info.value.detail
+
+
+def test_references_to_documents_created_earlier_are_not_checked_again():
+    steps = _prepare([
+        _op("create", "passports", ref="p", body=PASSPORT),
+        _op("create", "flights", ref="f", body=FLIGHT),
+        _op("create", "clients", ref="c", body=_client({"$ref": "p"})),
+        _op("create", "reservations", body=_reservation({"$ref": "f"}, {"$ref": "c"}, [{"$ref": "p"}, "0" * 24])),
+    ])
+
+    assert _external_references(steps) == {"passports": ["0" * 24]}
+
+
+def test_reference_to_a_document_created_in_another_collection_is_rejected():
+    steps = _prepare([
+        _op("create", "passports", ref="p", body=PASSPORT),
+        _op("create", "reservations", body=_reservation({"$ref": "p"}, {"$ref": "p"}, [{"$ref": "p"}])),
+    ])
+
+    with pytest.raises(HTTPException) as exc_info:
+        _external_references(steps)
+    assert _status(exc_info) == 400
+    assert "flight_id must reference flights" in exc_info.value.detail
+
+
+def test_only_consecutive_creates_on_one_resource_are_grouped():
+    steps = _prepare([
+        _op("create", "passports", ref="p1", body=PASSPORT),
+        _op("create", "passports", ref="p2", body=PASSPORT),
+        _op("create", "clients", body=_client({"$ref": "p1"})),
+        _op("update", "passports", id={"$ref": "p1"}, body=PASSPORT),
+        _op("update", "passports", id={"$ref": "p2"}, body=PASSPORT),
+        _op("delete", "passports", id={"$ref": "p2"}),
+        _op("create", "passports", body=PASSPORT),
+    ])
+
+    assert [[step.index for step in group] for group in _group(steps)] == [[0, 1], [2], [3], [4], [5], [6]]
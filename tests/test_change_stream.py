@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+
+from src.app.database.archive import archive_cutoff
+from src.app.database.change_stream import ChangeEvent, ChangeStreamHub, Subscriber, _is_archive_delete
+
+
+def _event(collection="reservations", flight_id=None, date_of_flight=None, operation="delete"):
+    return ChangeEvent("token", collection, operation, flight_id, date_of_flight)
+
+
+def test_date_filter_drops_events_with_unknown_date():
+    subscriber = Subscriber(collections=("flights", "reservations"), date="2026-10-19")
+
+    assert not subscriber.matches(_event(flight_id="f1"))
+    assert not subscriber.matches(_event(collection="flights", flight_id="f1"))
+    assert not subscriber.matches(_event(flight_id="f1", date_of_flight="2026-10-20"))
+    assert subscriber.matches(_event(flight_id="f1", date_of_flight="2026-10-19"))
+
+
+def test_flight_filter_drops_events_with_unknown_flight():
+    subscriber = Subscriber(collections=("reservations",), flight_id="f1")
+
+    assert not subscriber.matches(_event())
+    assert not subscriber.matches(_event(flight_id="f2"))
+    assert subscriber.matches(_event(flight_id="f1"))
+
+
+def test_unfiltered_subscriber_only_checks_collection():
+    subscriber = Subscriber(collections=("flights",))
+
+    assert subscriber.matches(_event(collection="flights"))
+    assert not subscriber.matches(_event(collection="reservations"))
+
+
+def test_deletes_of_departed_flights_are_treated_as_archiving():
+    departed = "2000-01-01"
+    upcoming = "2999-01-01"
+    assert departed < archive_cutoff() < upcoming
+
+    assert _is_archive_delete(_event(flight_id="f1", date_of_flight=departed))
+    assert _is_archive_delete(_event(collection="flights", flight_id="f1", date_of_flight=departed))
+    assert not _is_archive_delete(_event(flight_id="f1", date_of_flight=upcoming))
+    assert not _is_archive_delete(_event(flight_id="f1", date_of_flight=departed, operation="update"))
+    assert not _is_archive_delete(_event(flight_id="f1"))
+
+
+def test_listeners_see_every_change_but_subscribers_only_their_collections():
+    hub = ChangeStreamHub(db=None)
+    seen = []
+    hub.add_listener(seen.append)
+    subscriber = hub.subscribe(Subscriber(collections=("flights", "reservations")))
+
+    hub._publish(_event(collection="clients", operation="delete"))
+    hub._publish(_event(flight_id="f1", date_of_flight="2000-01-01"))
+
+    assert [event.collection for event in seen] == ["clients", "reservations"]
+    assert subscriber.queue.empty()
+
+
+def _drain(subscriber):
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+
+def test_resume_replays_buffered_events_after_last_id():
+    hub = ChangeStreamHub(db=None)
+    for token in ("t1", "t2", "t3"):
+        hub._publish(ChangeEvent(token, "flights", "update", "f1", "2999-01-01"))
+
+    subscriber = hub.subscribe(Subscriber(), last_event_id="t1")
+
+    assert [event.id for event in _drain(subscriber)] == ["t2", "t3"]
+    assert hub.subscriber_count == 1
+
+
+def test_resume_from_unknown_id_resets_and_keeps_streaming():
+    hub = ChangeStreamHub(db=None)
+    hub._publish(ChangeEvent("t1", "flights", "update", "f1", "2999-01-01"))
+
+    subscriber = hub.subscribe(Subscriber(), last_event_id="gone")
+    hub._publish(ChangeEvent("t2", "flights", "update", "f1", "2999-01-01"))
+
+    reset, live = _drain(subscriber)
+    assert reset.operation == "reset" and not reset.ends_stream
+    assert live.id == "t2"
+    assert hub.subscriber_count == 1
+
+
+def test_slow_subscriber_overflows_and_is_dropped():
+    hub = ChangeStreamHub(db=None)
+    subscriber = hub.subscribe(Subscriber(queue_size=2))
+    for token in ("t1", "t2", "t3"):
+        hub._publish(ChangeEvent(token, "flights", "update", "f1", "2999-01-01"))
+
+    [overflow] = _drain(subscriber)
+    assert overflow.operation == "overflow" and overflow.ends_stream
+    assert hub.subscriber_count == 0
+
+    hub._publish(ChangeEvent("t4", "flights", "update", "f1", "2999-01-01"))
+    assert subscriber.queue.empty()
+
+
+def test_archive_deletes_follow_the_configured_horizon():
+    ten_days_ago = (datetime.now(timezone.utc).date() - timedelta(days=10)).strftime("%Y-%m-%d")
+    hub = ChangeStreamHub(db=None, archive_horizon_days=7)
+    subscriber = hub.subscribe(Subscriber(collections=("flights",)))
+
+    hub._publish(_event(collection="flights", flight_id="f1", date_of_flight=ten_days_ago))
+
+    assert subscriber.queue.empty()
+    assert not _is_archive_delete(_event(collection="flights", flight_id="f1", date_of_flight=ten_days_ago))
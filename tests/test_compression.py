@@ -0,0 +1,88 @@
+import asyncio
+import gzip
+
+import pytest
+
+from src.app.middleware import compression
+from src.app.middleware.compression import CompressionMiddleware, negotiate
+
+
+@pytest.fixture
+def all_encodings(monkeypatch):
+    monkeypatch.setattr(compression, "COMPRESSORS", {name: None for name in ("zstd", "br", "gzip")})
+
+
+def test_server_preference_breaks_ties(all_encodings):
+    assert negotiate("gzip, br, zstd") == "zstd"
+    assert negotiate("gzip, br") == "br"
+
+
+def test_higher_quality_wins(all_encodings):
+    assert negotiate("zstd;q=0.5, gzip") == "gzip"
+    assert negotiate("gzip; q=0.8, br;q=0.9") == "br"
+
+
+def test_q_zero_excludes_encoding(all_encodings):
+    assert negotiate("zstd;q=0, br;q=0, gzip") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("zstd;level=1;q=0, gzip;q=0.1") == "gzip"
+
+
+def test_wildcard(all_encodings):
+    assert negotiate("*") == "zstd"
+    assert negotiate("zstd;q=0, *") == "br"
+    assert negotiate("*;q=0") is None
+    assert negotiate("gzip, *;q=0") == "gzip"
+
+
+def test_identity_and_unknown_encodings_are_not_compressed(all_encodings):
+    assert negotiate("identity") is None
+    assert negotiate("deflate, compress") is None
+    assert negotiate("") is None
+
+
+def test_invalid_quality_counts_as_zero(all_encodings):
+    assert negotiate("zstd;q=high, gzip") == "gzip"
+
+
+def test_unavailable_encodings_are_skipped(monkeypatch):
+    monkeypatch.setattr(compression, "COMPRESSORS", {"gzip": None})
+    assert negotiate("zstd, br, gzip;q=0.1") == "gzip"
+    assert negotiate("zstd, br") is None
+
+
+def _respond(body: bytes, content_type: str = "application/json", accept_encoding: str = "gzip") -> list[dict]:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type.encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app)(scope, None, send))
+    return sent
+
+
+def test_large_body_is_compressed():
+    body = b'{"flights": []}' * 200
+    start, message = _respond(body)
+
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(message["body"])
+    assert gzip.decompress(message["body"]) == body
+
+
+def test_small_body_and_event_streams_pass_through():
+    start, message = _respond(b"{}")
+    assert b"content-encoding" not in dict(start["headers"])
+    assert message["body"] == b"{}"
+
+    body = b"data: {}\n\n" * 200
+    start, message = _respond(body, content_type="text/event-stream")
+    assert b"content-encoding" not in dict(start["headers"])
+    assert message["body"] == body
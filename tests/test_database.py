@@ -0,0 +1,38 @@
+import base64
+
+import bson
+import pytest
+from bson import Timestamp
+
+from src.app.database.database import decode_causal_token
+
+
+def _token(document: dict) -> str:
+    return base64.urlsafe_b64encode(bson.encode(document)).decode()
+
+
+def test_decode_causal_token_round_trip():
+    cluster_time = {"clusterTime": Timestamp(100, 2), "signature": {"hash": b"\0" * 20, "keyId": 0}}
+    token = _token({"operationTime": Timestamp(100, 1), "clusterTime": cluster_time})
+
+    operation_time, decoded_cluster_time = decode_causal_token(token)
+
+    assert operation_time == Timestamp(100, 1)
+    assert decoded_cluster_time["clusterTime"] == Timestamp(100, 2)
+
+
+def test_decode_causal_token_without_cluster_time():
+    assert decode_causal_token(_token({"operationTime": Timestamp(1, 1)})) == (Timestamp(1, 1), None)
+
+
+@pytest.mark.parametrize("token", [
+    "not base64 at all!",
+    _token({"clusterTime": {"clusterTime": Timestamp(1, 1)}}),
+    _token({"operationTime": 5}),
+    _token({"operationTime": Timestamp(1, 1), "clusterTime": 5}),
+    _token({"operationTime": Timestamp(1, 1), "clusterTime": {"signature": {}}}),
+    _token({"operationTime": Timestamp(1, 1), "clusterTime": {"clusterTime": 7}}),
+])
+def test_decode_causal_token_rejects_malformed_tokens(token):
+    with pytest.raises(ValueError):
+        decode_causal_token(token)
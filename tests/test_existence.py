@@ -0,0 +1,123 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from src.app.database.change_stream import ChangeEvent
+from src.app.database.existence import BLOOM_ERROR_RATE, BloomFilter, ExistenceIndex, ExistenceIndexes
+
+
+class _Cursor:
+    def __init__(self, documents):
+        self._documents = iter(documents)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Collection:
+    def __init__(self, ids):
+        self._ids = ids
+
+    async def estimated_document_count(self):
+        return len(self._ids)
+
+    def find(self, *args, **kwargs):
+        return _Cursor({"_id": object_id} for object_id in self._ids)
+
+
+def _seeded(ids) -> ExistenceIndex:
+    index = ExistenceIndex("flights")
+    asyncio.run(index.seed({"flights": _Collection(ids)}))
+    return index
+
+
+def _id_at(moment: datetime) -> ObjectId:
+    return ObjectId(ObjectId.from_datetime(moment).binary[:4] + os.urandom(8))
+
+
+def _old_id() -> ObjectId:
+    return _id_at(datetime.now(timezone.utc) - timedelta(days=1))
+
+
+def test_bloom_false_positive_rate_at_capacity():
+    bloom = BloomFilter(10_000)
+    for _ in range(10_000):
+        bloom.add(os.urandom(12))
+
+    trials = 20_000
+    false_positives = sum(os.urandom(12) in bloom for _ in range(trials))
+
+    assert false_positives / trials < BLOOM_ERROR_RATE * 2
+    assert abs(bloom.estimated_false_positive_rate - BLOOM_ERROR_RATE) < BLOOM_ERROR_RATE / 2
+
+
+def test_bloom_has_no_false_negatives():
+    bloom = BloomFilter(1_000)
+    keys = [os.urandom(12) for _ in range(5_000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+
+
+def test_seeded_ids_are_never_rejected():
+    ids = [_old_id() for _ in range(1_000)]
+    index = _seeded(ids)
+
+    assert all(index.classify(object_id) is None for object_id in ids)
+
+
+def test_unknown_old_ids_are_rejected():
+    index = _seeded([_old_id() for _ in range(100)])
+
+    # A few may be false positives and go to Mongo, but none is reported as existing.
+    answers = [index.classify(_old_id()) for _ in range(100)]
+    assert True not in answers
+    assert answers.count(False) >= 90
+
+
+def test_ids_generated_after_the_seed_are_never_rejected():
+    index = _seeded([_old_id() for _ in range(100)])
+
+    # Another worker may insert these after our scan; only Mongo can tell.
+    assert index.classify(ObjectId()) is None
+    assert index.classify(_id_at(datetime.now(timezone.utc) - timedelta(seconds=1))) is None
+
+
+def test_unseeded_index_rejects_nothing():
+    assert ExistenceIndex("flights").classify(_old_id()) is None
+
+
+def test_cached_positive_expires():
+    index = ExistenceIndex("flights", cache_ttl=0)
+    object_id = ObjectId()
+    index.add(object_id)
+
+    assert index.classify(object_id) is None
+    assert index.report()["cached_positives"] == 0
+
+
+def test_delete_seen_on_change_stream_drops_cached_positive():
+    indexes = ExistenceIndexes()
+    object_id = ObjectId()
+    indexes.on_change(ChangeEvent("t1", "clients", "insert", document_id=str(object_id)))
+    assert indexes["clients"].classify(object_id) is True
+
+    indexes.on_change(ChangeEvent("t2", "clients", "delete", document_id=str(object_id)))
+    assert indexes["clients"].classify(object_id) is None
+
+
+def test_changes_to_other_collections_are_ignored():
+    indexes = ExistenceIndexes()
+    indexes.on_change(ChangeEvent("t1", "reservations", "insert", document_id=str(ObjectId())))
+    indexes.on_change(ChangeEvent("t2", "flights", "insert", document_id="not-an-id"))
+
+    assert all(report["cached_positives"] == 0 for report in indexes.report().values())
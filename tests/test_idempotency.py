@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from src.app.middleware import idempotency
+from src.app.middleware.idempotency import COLLECTION, IdempotencyMiddleware, _lock_expired
+
+
+def _matches(document: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(_matches(document, option) for option in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(field)
+            if "$exists" in condition and (field in document) != condition["$exists"]:
+                return False
+            if "$lt" in condition and not (value is not None and value < condition["$lt"]):
+                return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+
+class _Keys:
+    """
+    In-memory stand-in for the idempotency_keys collection.
+    """
+
+    def __init__(self):
+        self.documents: dict[str, dict] = {}
+
+    async def find_one(self, query):
+        return next((dict(d) for d in self.documents.values() if _matches(d, query)), None)
+
+    async def insert_one(self, document):
+        if document["_id"] in self.documents:
+            raise DuplicateKeyError("duplicate key")
+        self.documents[document["_id"]] = dict(document)
+
+    async def update_one(self, query, update):
+        document = next((d for d in self.documents.values() if _matches(d, query)), None)
+        if document is None:
+            return SimpleNamespace(matched_count=0, modified_count=0)
+        document.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            document.pop(field, None)
+        return SimpleNamespace(matched_count=1, modified_count=1)
+
+    async def delete_one(self, query):
+        for record_id, document in list(self.documents.items()):
+            if _matches(document, query):
+                del self.documents[record_id]
+                return
+
+
+class _Handler:
+    def __init__(self, status=201, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        request = await receive()
+        await asyncio.sleep(self.delay)
+        body = json.dumps({"call": self.calls, "echo": request["body"].decode()}).encode()
+        await send({"type": "http.response.start", "status": self.status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def _request(middleware, db, body=b'{"a": 1}', key="k1"):
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/v1/reservation/",
+        "headers": [(b"idempotency-key", key.encode())],
+        "app": SimpleNamespace(state=SimpleNamespace(db=db)),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def run():
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware(scope, receive, send)
+        start, message = sent
+        return start["status"], dict(start["headers"]), message["body"]
+
+    return run()
+
+
+@pytest.fixture
+def db():
+    return {COLLECTION: _Keys()}
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(idempotency, "POLL_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(idempotency, "MAX_POLL_INTERVAL_SECONDS", 0.01)
+
+
+def test_concurrent_duplicates_run_the_handler_once(db):
+    handler = _Handler(delay=0.05)
+    middleware = IdempotencyMiddleware(handler)
+
+    async def run():
+        return await asyncio.gather(*(_request(middleware, db) for _ in range(3)))
+
+    responses = asyncio.run(run())
+
+    assert handler.calls == 1
+    assert {body for _, _, body in responses} == {responses[0][2]}
+    assert [headers.get(b"idempotent-replayed") for _, headers, _ in responses].count(b"true") == 2
+
+
+def test_duplicate_in_another_worker_waits_for_the_result(db):
+    handler = _Handler(delay=0.05)
+    workers = [IdempotencyMiddleware(handler), IdempotencyMiddleware(handler)]
+
+    async def run():
+        return await asyncio.gather(*(_request(worker, db) for worker in workers))
+
+    first, second = asyncio.run(run())
+
+    assert handler.calls == 1
+    assert second[2] == first[2]
+    assert second[0] == 201
+
+
+def test_later_duplicate_is_replayed_from_the_store(db):
+    handler = _Handler()
+    status, headers, body = asyncio.run(_request(IdempotencyMiddleware(handler), db))
+    assert b"idempotent-replayed" not in headers
+
+    replayed = asyncio.run(_request(IdempotencyMiddleware(handler), db))
+
+    assert handler.calls == 1
+    assert replayed[0] == status == 201
+    assert replayed[1][b"idempotent-replayed"] == b"true"
+    assert replayed[1][b"content-type"] == b"application/json"
+    assert replayed[2] == body
+
+
+def test_same_key_with_different_body_is_rejected(db):
+    middleware = IdempotencyMiddleware(_Handler())
+    asyncio.run(_request(middleware, db))
+
+    status, _, _ = asyncio.run(_request(middleware, db, body=b'{"a": 2}'))
+
+    assert status == 422
+
+
+def test_server_errors_are_not_stored(db):
+    failing = _Handler(status=503)
+    status, _, _ = asyncio.run(_request(IdempotencyMiddleware(failing), db))
+    assert status == 503
+    assert db[COLLECTION].documents == {}
+
+    handler = _Handler()
+    status, headers, _ = asyncio.run(_request(IdempotencyMiddleware(handler), db))
+    assert status == 201 and handler.calls == 1
+    assert b"idempotent-replayed" not in headers
+
+
+def _abandoned_claim(db, locked_until, body=b'{"a": 1}'):
+    record_id = "/api/v1/reservation/ k1"
+    db[COLLECTION].documents[record_id] = {
+        "_id": record_id,
+        "fingerprint": hashlib.sha256(body).hexdigest(),
+        "status": "in_progress",
+        "owner": "dead-worker",
+        "locked_until": locked_until,
+        "created_at": datetime.now(timezone.utc),
+    }
+    return record_id
+
+
+def test_lapsed_claim_is_taken_over(db):
+    record_id = _abandoned_claim(db, datetime.now(timezone.utc) - timedelta(seconds=1))
+    handler = _Handler()
+
+    status, headers, _ = asyncio.run(_request(IdempotencyMiddleware(handler), db))
+
+    assert status == 201 and handler.calls == 1
+    assert b"idempotent-replayed" not in headers
+    record = db[COLLECTION].documents[record_id]
+    assert record["status"] == "completed" and "owner" not in record
+
+
+def test_waiting_duplicate_takes_over_once_the_lock_lapses(db):
+    _abandoned_claim(db, datetime.now(timezone.utc) + timedelta(seconds=0.1))
+    handler = _Handler()
+
+    status, _, _ = asyncio.run(_request(IdempotencyMiddleware(handler), db))
+
+    assert status == 201 and handler.calls == 1
+
+
+def test_live_claim_is_not_taken_over(db, monkeypatch):
+    monkeypatch.setattr(idempotency, "WAIT_TIMEOUT_SECONDS", 0.05)
+    _abandoned_claim(db, datetime.now(timezone.utc) + timedelta(seconds=10))
+    handler = _Handler()
+
+    status, _, _ = asyncio.run(_request(IdempotencyMiddleware(handler), db))
+
+    assert status == 409 and handler.calls == 0
+
+
+def test_claim_without_lock_can_be_taken_over():
+    assert _lock_expired({"status": "in_progress"})
+
+
+def test_lock_expiry():
+    now = datetime.now(timezone.utc)
+
+    assert _lock_expired({"locked_until": now - timedelta(seconds=1)})
+    assert not _lock_expired({"locked_until": now + timedelta(seconds=5)})
+
+
+def test_naive_datetimes_from_mongo_are_utc():
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    assert _lock_expired({"locked_until": now - timedelta(seconds=1)})
+    assert not _lock_expired({"locked_until": now + timedelta(seconds=5)})
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+
+from src.app.jobs import runner
+from src.app.jobs.runner import JobRunner
+
+
+class _Result:
+    def __init__(self, matched_count):
+        self.matched_count = matched_count
+
+
+class _Jobs:
+    """
+    Stand-in for the jobs collection that answers lease renewals from a script.
+    """
+
+    def __init__(self, renewals):
+        self._renewals = list(renewals)
+        self.updates = []
+
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+        if "lease_expires" in update.get("$set", {}):
+            outcome = self._renewals.pop(0) if self._renewals else 1
+            if isinstance(outcome, Exception):
+                raise outcome
+            return _Result(outcome)
+        return _Result(1)
+
+
+async def _slow_handler(ctx):
+    await asyncio.sleep(10)
+    return {"done": True}
+
+
+def _run_job(renewals) -> _Jobs:
+    jobs = _Jobs(renewals)
+    job_runner = JobRunner({runner.COLLECTION: jobs}, {"slow": _slow_handler})
+    job = {"_id": ObjectId(), "type": "slow", "attempts": 1, "owner": job_runner.owner}
+    asyncio.run(asyncio.wait_for(job_runner._execute(job), 5))
+    return jobs
+
+
+@pytest.fixture(autouse=True)
+def short_lease(monkeypatch):
+    monkeypatch.setattr(runner, "LEASE_SECONDS", 0.06)
+    monkeypatch.setattr(runner, "AsyncIOMotorGridFSBucket", lambda db, bucket_name: None)
+
+
+def test_job_stops_when_another_worker_took_it():
+    jobs = _run_job([1, 0])
+
+    assert all("status" not in update.get("$set", {}) for _, update in jobs.updates)
+
+
+def test_job_stops_when_renewals_keep_failing():
+    jobs = _run_job([AutoReconnect("down")] * 5)
+
+    assert all("status" not in update.get("$set", {}) for _, update in jobs.updates)
+
+
+def test_job_survives_a_single_failed_renewal():
+    async def quick_handler(ctx):
+        await asyncio.sleep(0.1)
+        return {"done": True}
+
+    jobs = _Jobs([AutoReconnect("down")])
+    job_runner = JobRunner({runner.COLLECTION: jobs}, {"quick": quick_handler})
+    job = {"_id": ObjectId(), "type": "quick", "attempts": 1}
+    asyncio.run(job_runner._execute(job))
+
+    query, update = jobs.updates[-1]
+    assert query == {"_id": job["_id"], "owner": job_runner.owner}
+    assert update["$set"]["status"] == "completed"